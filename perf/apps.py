@@ -0,0 +1,26 @@
+from django.apps import AppConfig
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_out
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+
+
+class PerfConfig(AppConfig):
+    name = 'perf'
+    verbose_name = 'Производительность'
+
+    def ready(self):
+        from .auth import forget_user
+        from .sqlite import apply_pragmas
+        connection_created.connect(
+            apply_pragmas, dispatch_uid='perf.sqlite.apply_pragmas'
+        )
+        for signal in (post_save, post_delete):
+            signal.connect(
+                forget_user,
+                sender=settings.AUTH_USER_MODEL,
+                dispatch_uid='perf.auth.forget_user',
+            )
+        user_logged_out.connect(
+            forget_user, dispatch_uid='perf.auth.forget_user'
+        )
@@ -0,0 +1,40 @@
+"""Пользователи из кеша вместо запроса к БД на каждый запрос.
+
+Вместе с сессиями cached_db авторизованный запрос не обращается к БД
+ради сессии и пользователя. Запись пользователя удаляется из кеша при
+любом его сохранении (в том числе при смене пароля и входе), удалении
+и выходе. Локальный кеш процесса не узнаёт о смене пароля в других
+процессах, поэтому USER_CACHE_TIMEOUT ограничивает, сколько старая
+сессия может прожить там; в нескольких процессах нужен общий кеш.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+
+def user_cache_key(user_id):
+    return f'perf:user:{user_id}'
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, который берёт пользователя сессии из кеша."""
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+        return user
+
+
+def forget_user(sender, instance=None, user=None, **kwargs):
+    """Удаляет пользователя из кеша.
+
+    Подключается к post_save и post_delete модели пользователя и к
+    user_logged_out, который передаёт пользователя в user.
+    """
+    user = instance if instance is not None else user
+    if user is not None:
+        cache.delete(user_cache_key(user.pk))
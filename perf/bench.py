@@ -0,0 +1,468 @@
+"""Нагрузочные прогоны проекта внутри процесса.
+
+Запросы отправляются напрямую в WSGI-приложение (или операции с БД
+выполняются напрямую) из нескольких потоков, на отдельной базе данных,
+которая создаётся и удаляется на время прогона. Результат сохраняется
+в JSON и может сравниваться с эталоном.
+"""
+import json
+import platform
+import random
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from importlib import import_module
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY
+from django.contrib.auth import SESSION_KEY
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import request_finished, request_started
+from django.core.wsgi import get_wsgi_application
+from django.db import OperationalError, connection, connections
+from django.test import RequestFactory, override_settings
+from django.urls import resolve
+
+from .stats import percentile
+
+
+class Scenario:
+    """Один маршрут прогона: имя, адрес и, если нужно, пользователь."""
+
+    def __init__(self, name, path, user=None):
+        self.name = name
+        self.path = path
+        self.cookie = session_cookie(user) if user is not None else ''
+
+    def environ(self):
+        extra = {'HTTP_HOST': 'localhost'}
+        if self.cookie:
+            extra['HTTP_COOKIE'] = self.cookie
+        return RequestFactory().get(self.path, **extra).environ
+
+
+def session_cookie(user):
+    """Cookie сессии, в которой пользователь уже вошёл."""
+    store = import_module(settings.SESSION_ENGINE).SessionStore()
+    store[SESSION_KEY] = user._meta.pk.value_to_string(user)
+    store[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    store[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    store.save()
+    return f'{settings.SESSION_COOKIE_NAME}={store.session_key}'
+
+
+@contextmanager
+def benchmark_database(path=None):
+    """Отдельная файловая база на время прогона."""
+    with tempfile.TemporaryDirectory() as directory:
+        connection.settings_dict['TEST']['NAME'] = str(
+            path or Path(directory) / 'benchmark.sqlite3'
+        )
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def run_scenario(application, scenario, requests, threads):
+    """Прогоняет маршрут и возвращает задержки в миллисекундах."""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    statuses = {}
+
+    def start_response(status, headers, exc_info=None):
+        statuses[threading.get_ident()] = int(status.split()[0])
+
+    def worker(count):
+        nonlocal errors
+        local = []
+        local_errors = 0
+        try:
+            for _ in range(count):
+                environ = scenario.environ()
+                started = time.perf_counter()
+                response = application(environ, start_response)
+                try:
+                    for _ in response:
+                        pass
+                finally:
+                    response.close()
+                local.append((time.perf_counter() - started) * 1000)
+                if statuses[threading.get_ident()] >= 400:
+                    local_errors += 1
+        finally:
+            connections.close_all()
+        with lock:
+            latencies.extend(local)
+            errors += local_errors
+
+    share, rest = divmod(requests, threads)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        futures = [
+            executor.submit(worker, share + (index < rest))
+            for index in range(threads)
+        ]
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - started
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 1),
+        'mean': round(statistics.fmean(latencies), 3),
+        'p50': round(percentile(latencies, 0.5), 3),
+        'p95': round(percentile(latencies, 0.95), 3),
+        'p99': round(percentile(latencies, 0.99), 3),
+    }
+
+
+def summarize_latencies(latencies, elapsed):
+    return {
+        'ops_per_sec': round(len(latencies) / elapsed, 1),
+        'p50': round(percentile(latencies, 0.5), 3),
+        'p95': round(percentile(latencies, 0.95), 3),
+        'p99': round(percentile(latencies, 0.99), 3),
+    }
+
+
+def run_mixed(read, write, operations, threads, write_ratio, seed):
+    """Смешанная нагрузка чтения и записи на БД из нескольких потоков.
+
+    read и write получают генератор случайных чисел потока. Каждая
+    операция обрамлена сигналами начала и конца запроса, как в
+    обработчике WSGI, поэтому CONN_MAX_AGE действует так же, как на
+    сервере. Ошибки блокировки БД считаются, а не прерывают прогон.
+    """
+    latencies = {'read': [], 'write': []}
+    errors = {'read': 0, 'write': 0}
+    lock = threading.Lock()
+
+    def worker(index, count):
+        rnd = random.Random(seed + index)
+        local = {'read': [], 'write': []}
+        local_errors = {'read': 0, 'write': 0}
+        try:
+            for _ in range(count):
+                kind = 'write' if rnd.random() < write_ratio else 'read'
+                operation = write if kind == 'write' else read
+                request_started.send(sender=None)
+                started = time.perf_counter()
+                try:
+                    operation(rnd)
+                except OperationalError:
+                    local_errors[kind] += 1
+                else:
+                    local[kind].append(
+                        (time.perf_counter() - started) * 1000
+                    )
+                finally:
+                    request_finished.send(sender=None)
+        finally:
+            connections.close_all()
+        with lock:
+            for kind in latencies:
+                latencies[kind].extend(local[kind])
+                errors[kind] += local_errors[kind]
+
+    share, rest = divmod(operations, threads)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        futures = [
+            executor.submit(worker, index, share + (index < rest))
+            for index in range(threads)
+        ]
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - started
+    result = {
+        'ops_per_sec': round(
+            sum(map(len, latencies.values())) / elapsed, 1
+        ),
+    }
+    for kind, values in latencies.items():
+        result[kind] = {
+            'ops': len(values),
+            'errors': errors[kind],
+            **(summarize_latencies(values, elapsed) if values else {}),
+        }
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """Маршруты, где пропускная способность упала или p95 вырос
+    больше, чем на долю tolerance относительно эталона.
+    """
+    regressions = []
+    for name, current in results['routes'].items():
+        previous = baseline['routes'].get(name)
+        if previous is None:
+            continue
+        if current['rps'] < previous['rps'] * (1 - tolerance):
+            regressions.append(
+                f'{name}: {previous["rps"]} -> {current["rps"]} req/s'
+            )
+        if current['p95'] > previous['p95'] * (1 + tolerance):
+            regressions.append(
+                f'{name}: p95 {previous["p95"]} -> {current["p95"]} мс'
+            )
+    return regressions
+
+
+class BaseBenchmarkCommand(BaseCommand):
+    """Общая часть команд bench_http обоих проектов.
+
+    Наследник заполняет базу в seed(options) и возвращает список
+    сценариев Scenario.
+    """
+    help = (
+        'Заполняет отдельную базу данными заданного объёма и измеряет '
+        'пропускную способность и задержки каждого маршрута.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', type=Path)
+        parser.add_argument('--baseline', type=Path)
+        parser.add_argument(
+            '--tolerance', type=float, default=0.1,
+            help='Допустимое ухудшение относительно эталона (доля).',
+        )
+
+    def seed(self, options):
+        raise NotImplementedError
+
+    def handle(self, *args, **options):
+        # Отладочный режим копит все SQL-запросы в памяти и искажает замер.
+        settings.DEBUG = False
+        random.seed(options['seed'])
+        application = get_wsgi_application()
+        results = {
+            'meta': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'sqlite': connection.Database.sqlite_version,
+                **{
+                    key: value for key, value in options.items()
+                    if isinstance(value, (int, float))
+                    and key not in ('verbosity', 'traceback')
+                },
+            },
+            'routes': {},
+        }
+        with benchmark_database():
+            scenarios = self.seed(options)
+            for scenario in scenarios:
+                if options['warmup']:
+                    run_scenario(
+                        application, scenario, options['warmup'], 1
+                    )
+                result = run_scenario(
+                    application, scenario,
+                    options['requests'], options['threads'],
+                )
+                results['routes'][scenario.name] = result
+                self.stdout.write(
+                    f'{scenario.name:<24}{result["rps"]:>10} req/s'
+                    f'{result["p50"]:>10} p50{result["p95"]:>10} p95'
+                    f'{result["p99"]:>10} p99  ошибок: {result["errors"]}'
+                )
+        if options['output']:
+            options['output'].write_text(json.dumps(results, indent=2))
+        if options['baseline']:
+            baseline = json.loads(options['baseline'].read_text())
+            regressions = compare(results, baseline, options['tolerance'])
+            if regressions:
+                raise CommandError(
+                    'Ухудшение относительно эталона:\n'
+                    + '\n'.join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS('Ухудшений нет.'))
+
+
+class BaseMixedBenchmarkCommand(BaseCommand):
+    """Общая часть команд bench_sqlite обоих проектов.
+
+    Наследник заполняет базу в seed(options) и возвращает пару функций
+    чтения и записи, каждая выполняет одну операцию над случайными
+    данными. Прогон повторяется на двух новых базах: без прагм с новым
+    соединением на каждый запрос и с профилем SQLITE_PRAGMAS и
+    CONN_MAX_AGE из текущих настроек.
+    """
+    help = (
+        'Сравнивает смешанную нагрузку чтения и записи на SQLite с '
+        'настройками по умолчанию и с профилем из текущих настроек. '
+        'Запускается с --settings <проект>.settings_production.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--operations', type=int, default=5000)
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument(
+            '--write-ratio', type=float, default=0.2,
+            help='Доля операций записи.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', type=Path)
+
+    def seed(self, options):
+        raise NotImplementedError
+
+    def handle(self, *args, **options):
+        settings.DEBUG = False
+        profiles = {
+            'default': ({}, 0),
+            'production': (
+                settings.SQLITE_PRAGMAS,
+                connection.settings_dict['CONN_MAX_AGE'],
+            ),
+        }
+        if profiles['production'] == profiles['default']:
+            raise CommandError(
+                'В текущих настройках нет прагм и CONN_MAX_AGE: '
+                'запустите команду с профилем settings_production.'
+            )
+        results = {'meta': {
+            'sqlite': connection.Database.sqlite_version,
+            'operations': options['operations'],
+            'threads': options['threads'],
+            'write_ratio': options['write_ratio'],
+        }, 'profiles': {}}
+        conn_max_age = connection.settings_dict['CONN_MAX_AGE']
+        try:
+            for name, (pragmas, max_age) in profiles.items():
+                connection.settings_dict['CONN_MAX_AGE'] = max_age
+                with override_settings(SQLITE_PRAGMAS=pragmas), \
+                        benchmark_database():
+                    read, write = self.seed(options)
+                    result = run_mixed(
+                        read, write, options['operations'],
+                        options['threads'], options['write_ratio'],
+                        options['seed'],
+                    )
+                results['profiles'][name] = result
+                self.report(name, result)
+        finally:
+            connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+        if options['output']:
+            options['output'].write_text(json.dumps(results, indent=2))
+
+    def report(self, name, result):
+        self.stdout.write(f'{name}: {result["ops_per_sec"]} оп/с')
+        for kind in ('read', 'write'):
+            row = result[kind]
+            self.stdout.write(
+                f'  {kind:<6}{row.get("ops_per_sec", 0):>10} оп/с'
+                f'{row.get("p50", 0):>10} p50{row.get("p95", 0):>10} p95'
+                f'{row.get("p99", 0):>10} p99  ошибок: {row["errors"]}'
+            )
+
+
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+# Название, кеширующий загрузчик шаблонов, кеш фрагментов.
+RENDER_VARIANTS = (
+    ('без кеша', False, False),
+    ('cached loader', True, False),
+    ('cached loader + фрагменты', True, True),
+)
+
+
+def render_settings(cached_loader, fragments):
+    """Настройки шаблонов и кешей для варианта прогона отрисовки."""
+    loaders = TEMPLATE_LOADERS
+    if cached_loader:
+        loaders = [('django.template.loaders.cached.Loader', loaders)]
+    engine = settings.TEMPLATES[0]
+    templates = [{
+        **engine,
+        'APP_DIRS': False,
+        'OPTIONS': {**engine['OPTIONS'], 'loaders': loaders},
+    }]
+    caches = dict(settings.CACHES)
+    if not fragments:
+        caches['template_fragments'] = {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+        }
+    return override_settings(TEMPLATES=templates, CACHES=caches)
+
+
+def time_render(path, user, renders):
+    """Задержки отрисовки ответа представления в миллисекундах.
+
+    Представление вызывается каждый раз заново, а замеряется только
+    render() его TemplateResponse.
+    """
+    match = resolve(path)
+    latencies = []
+    for _ in range(renders):
+        request = RequestFactory().get(path, HTTP_HOST='localhost')
+        request.user = user
+        response = match.func(request, *match.args, **match.kwargs)
+        started = time.perf_counter()
+        response.render()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+class BaseRenderBenchmarkCommand(BaseCommand):
+    """Общая часть команд bench_render обоих проектов.
+
+    Наследник заполняет базу в seed(options) и возвращает список
+    (название, адрес, пользователь). Пользователь нужен
+    авторизованный, иначе страницы может отдать кеш страниц.
+    """
+    help = (
+        'Сравнивает время отрисовки шаблонов страниц без кеша, '
+        'с кеширующим загрузчиком шаблонов и с кешем фрагментов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--renders', type=int, default=300)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--output', type=Path)
+
+    def seed(self, options):
+        raise NotImplementedError
+
+    def handle(self, *args, **options):
+        settings.DEBUG = False
+        results = {}
+        with benchmark_database():
+            pages = self.seed(options)
+            for variant, cached_loader, fragments in RENDER_VARIANTS:
+                results[variant] = {}
+                with render_settings(cached_loader, fragments):
+                    for name, path, user in pages:
+                        time_render(path, user, options['warmup'])
+                        latencies = time_render(
+                            path, user, options['renders']
+                        )
+                        results[variant][name] = {
+                            'mean': round(statistics.fmean(latencies), 3),
+                            'p50': round(percentile(latencies, 0.5), 3),
+                            'p95': round(percentile(latencies, 0.95), 3),
+                        }
+        for variant, pages_result in results.items():
+            self.stdout.write(variant)
+            for name, row in pages_result.items():
+                self.stdout.write(
+                    f'  {name:<16}{row["mean"]:>10} мс{row["p50"]:>10} p50'
+                    f'{row["p95"]:>10} p95'
+                )
+        if options['output']:
+            options['output'].write_text(json.dumps(results, indent=2))
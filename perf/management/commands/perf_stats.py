@@ -0,0 +1,46 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from perf import stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Выводит p50/p95/p99 времени ответа, SQL, отрисовки и размера '
+        'ответа по именам URL, собранные всеми процессами.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        if not settings.PERF_STATS_DIR:
+            raise CommandError('Не задан каталог PERF_STATS_DIR.')
+        summary = stats.summarize(stats.load(settings.PERF_STATS_DIR))
+        if options['json']:
+            self.stdout.write(json.dumps(summary, indent=2))
+            return
+        header = (
+            f'{"URL":<24}{"запросов":>9}'
+            f'{"p50 мс":>9}{"p95 мс":>9}{"p99 мс":>9}'
+            f'{"SQL p95":>9}{"SQL шт. p95":>12}{"шаблон p95":>12}'
+        )
+        self.stdout.write(header)
+        for view_name, row in summary.items():
+            self.stdout.write(
+                f'{view_name:<24}{row["count"]:>9}'
+                + ''.join(
+                    f'{self.format(row[key]):>{width}}'
+                    for key, width in (
+                        ('total_p50', 9), ('total_p95', 9),
+                        ('total_p99', 9), ('sql_p95', 9),
+                        ('queries_p95', 12), ('render_p95', 12),
+                    )
+                )
+            )
+
+    @staticmethod
+    def format(value):
+        return '-' if value is None else f'{value:.1f}'
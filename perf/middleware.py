@@ -0,0 +1,96 @@
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import stats
+
+logger = logging.getLogger('perf')
+
+# Общий ключ замеров для запросов, не сопоставленных с маршрутом:
+# по пути каждый адрес сканера заводил бы свою запись.
+UNRESOLVED = '<unresolved>'
+
+
+class RequestTiming:
+    """Замеры одного запроса."""
+
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0.0
+        self.render = None
+        self._render_started = None
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обёртка выполнения SQL: считает запросы и их время."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql += time.perf_counter() - started
+            self.queries += 1
+
+    def render_started(self):
+        self._render_started = time.perf_counter()
+
+    def render_finished(self, response):
+        self.render = time.perf_counter() - self._render_started
+
+
+class PerformanceMiddleware:
+    """Замеряет время ответа, SQL, отрисовку шаблона и размер ответа.
+
+    Включается настройкой PERF_INSTRUMENTATION; когда она выключена,
+    Django исключает middleware из цепочки и накладных расходов нет.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PERF_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        stats.flush_at_exit()
+
+    def __call__(self, request):
+        timing = RequestTiming()
+        request.perf_timing = timing
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timing))
+            response = self.get_response(request)
+        total = time.perf_counter() - started
+
+        size = None if response.streaming else len(response.content)
+        match = request.resolver_match
+        view_name = match.view_name if match else UNRESOLVED
+        metrics = {
+            'total': total * 1000,
+            'sql': timing.sql * 1000,
+            'queries': timing.queries,
+            'render': None if timing.render is None else timing.render * 1000,
+            'size': size,
+        }
+        response['Server-Timing'] = ', '.join(filter(None, (
+            f'total;dur={metrics["total"]:.1f}',
+            f'db;dur={metrics["sql"]:.1f};desc="{timing.queries} queries"',
+            timing.render is not None
+            and f'render;dur={metrics["render"]:.1f}',
+        )))
+        stats.record(view_name, **metrics)
+        logger.info(json.dumps({
+            'view': view_name,
+            'path': request.path,
+            'method': request.method,
+            'status': response.status_code,
+            **metrics,
+        }))
+        return response
+
+    def process_template_response(self, request, response):
+        request.perf_timing.render_started()
+        response.add_post_render_callback(request.perf_timing.render_finished)
+        return response
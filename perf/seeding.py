@@ -0,0 +1,116 @@
+"""Помощники для быстрой массовой загрузки синтетических данных."""
+import itertools
+import time
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+
+@contextmanager
+def fast_sqlite():
+    """Отключает синхронизацию с диском на время загрузки в SQLite.
+
+    При сбое посреди загрузки база может остаться неполной, поэтому
+    режим подходит только для синтетических данных. Внутри транзакции
+    SQLite не позволяет его менять, и загрузка идёт как обычно.
+    """
+    if connection.vendor != 'sqlite' or connection.in_atomic_block:
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA synchronous')
+        synchronous = cursor.fetchone()[0]
+        cursor.execute('PRAGMA synchronous = OFF')
+        cursor.execute('PRAGMA cache_size = -262144')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA synchronous = {int(synchronous)}')
+
+
+def zipf_weights(count, skew):
+    """Накопленные веса распределения Ципфа для count элементов.
+
+    При skew=0 распределение равномерное, чем больше skew, тем сильнее
+    элементы с малыми номерами выделяются на фоне остальных.
+    """
+    return list(itertools.accumulate(
+        1 / (rank ** skew) for rank in range(1, count + 1)
+    ))
+
+
+def next_number(model):
+    """Первый номер для уникальных имён новых строк model.
+
+    Номер больше ключа любой существующей строки, поэтому имена не
+    повторяются ни после удаления строк, ни при повторном запуске.
+    """
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+def naive_now():
+    """Текущее время без часового пояса, в котором БД хранит даты.
+
+    От него можно отсчитывать даты для BulkLoader.insert(), не приводя
+    часовой пояс для каждой строки.
+    """
+    now = timezone.now()
+    if timezone.is_aware(now):
+        now = timezone.make_naive(now, timezone.utc)
+    return now
+
+
+class BulkLoader:
+    """Пишет строки пачками и считает скорость загрузки."""
+
+    def __init__(self, stdout, batch_size):
+        self.stdout = stdout
+        self.batch_size = batch_size
+        self.rows = 0
+        self.started = time.perf_counter()
+
+    def batches(self, model, rows):
+        """Пачки из итератора; в памяти не больше одной пачки."""
+        rows = iter(rows)
+        while True:
+            batch = list(itertools.islice(rows, self.batch_size))
+            if not batch:
+                break
+            yield batch
+            self.rows += len(batch)
+            self.stdout.write(
+                f'{model._meta.label}: {self.rows} строк, '
+                f'{self.rate():.0f} строк/мин',
+                ending='\r',
+            )
+        self.stdout.write('')
+
+    def load(self, model, objects):
+        """Сохраняет объекты моделей через bulk_create."""
+        for batch in self.batches(model, objects):
+            with transaction.atomic():
+                model.objects.bulk_create(batch, batch_size=self.batch_size)
+
+    def insert(self, model, fields, rows):
+        """Пишет кортежи значений полей fields одним executemany на пачку.
+
+        Объекты моделей не создаются, поэтому значения должны быть уже
+        в формате БД: даты — через connection.ops, внешние ключи — числа.
+        """
+        quote = connection.ops.quote_name
+        columns = [model._meta.get_field(name).column for name in fields]
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(
+            quote(model._meta.db_table),
+            ', '.join(map(quote, columns)),
+            ', '.join(['%s'] * len(columns)),
+        )
+        for batch in self.batches(model, rows):
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, batch)
+
+    def rate(self):
+        """Скорость загрузки в строках в минуту."""
+        return self.rows * 60 / max(time.perf_counter() - self.started, 1e-9)
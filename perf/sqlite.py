@@ -0,0 +1,15 @@
+"""Настройка соединений с SQLite прагмами из SQLITE_PRAGMAS."""
+from django.conf import settings
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    """Выполняет PRAGMA из настроек для каждого нового соединения.
+
+    Подключается к сигналу connection_created. Значения подставляются
+    в запрос как есть, поэтому берутся только из настроек проекта.
+    """
+    if connection.vendor != 'sqlite' or not settings.SQLITE_PRAGMAS:
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
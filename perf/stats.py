@@ -0,0 +1,124 @@
+"""Агрегаты времени ответа по именам URL.
+
+Каждый процесс хранит последние PERF_SAMPLES замеров на каждое имя URL
+и периодически сбрасывает их в файл perf-<pid>.json в PERF_STATS_DIR,
+откуда их собирает команда perf_stats.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+
+from django.conf import settings
+
+METRICS = ('total', 'sql', 'queries', 'render', 'size')
+
+_samples = defaultdict(
+    lambda: {metric: deque(maxlen=settings.PERF_SAMPLES) for metric in METRICS}
+)
+_lock = threading.Lock()
+# Сброс по интервалу и при выходе могут совпасть: файл процесса пишет
+# только один поток за раз.
+_flush_lock = threading.Lock()
+_last_flush = time.monotonic()
+_flush_at_exit = False
+
+
+def record(view_name, **values):
+    """Сохраняет замер одного запроса."""
+    global _last_flush
+    with _lock:
+        samples = _samples[view_name]
+        for metric in METRICS:
+            if values.get(metric) is not None:
+                samples[metric].append(values[metric])
+        if time.monotonic() - _last_flush < settings.PERF_FLUSH_INTERVAL:
+            return
+        _last_flush = time.monotonic()
+    flush()
+
+
+def _snapshot():
+    return {
+        view_name: {metric: list(values) for metric, values in samples.items()}
+        for view_name, samples in _samples.items()
+    }
+
+
+def snapshot():
+    with _lock:
+        return _snapshot()
+
+
+def reset():
+    with _lock:
+        _samples.clear()
+
+
+def flush():
+    """Записывает замеры процесса в PERF_STATS_DIR, если он задан.
+
+    Снимок берётся под блокировкой записи, поэтому более поздний сброс
+    не перезаписывается более старым.
+    """
+    if not settings.PERF_STATS_DIR:
+        return
+    with _flush_lock:
+        directory = Path(settings.PERF_STATS_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f'perf-{os.getpid()}.json'
+        temporary = path.with_suffix('.tmp')
+        temporary.write_text(json.dumps(snapshot()))
+        temporary.replace(path)
+
+
+def flush_at_exit():
+    """Сбрасывает замеры при выходе из процесса.
+
+    Обработчик регистрируется один раз, сколько бы раз ни создавался
+    middleware, например при каждом override_settings в тестах.
+    """
+    global _flush_at_exit
+    with _lock:
+        if not _flush_at_exit:
+            atexit.register(flush)
+            _flush_at_exit = True
+
+
+def load(directory):
+    """Объединяет замеры всех процессов из каталога."""
+    merged = defaultdict(lambda: {metric: [] for metric in METRICS})
+    for path in Path(directory).glob('perf-*.json'):
+        for view_name, samples in json.loads(path.read_text()).items():
+            for metric, values in samples.items():
+                merged[view_name][metric].extend(values)
+    return dict(merged)
+
+
+def percentile(values, fraction):
+    """Перцентиль по ближайшему рангу."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(int(round(fraction * len(ordered))) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def summarize(data):
+    """p50/p95/p99 каждой метрики по именам URL."""
+    return {
+        view_name: {
+            'count': len(samples['total']),
+            **{
+                f'{metric}_p{int(fraction * 100)}': percentile(
+                    samples[metric], fraction
+                )
+                for metric in METRICS
+                for fraction in (0.5, 0.95, 0.99)
+            },
+        }
+        for view_name, samples in sorted(data.items())
+    }
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.db import transaction
 
 from .models import Comment, News
 
@@ -13,3 +14,31 @@ class NewsAdmin(admin.ModelAdmin):
     inlines = [
         CommentInline,
     ]
+
+
+@admin.register(Comment)
+class CommentAdmin(admin.ModelAdmin):
+    """Комментарии; помеченные модерацией не выводятся на сайте, пока
+    с них не снимут отметку.
+    """
+    list_display = ('__str__', 'news', 'author', 'created', 'flagged')
+    list_editable = ('flagged',)
+    list_filter = ('flagged',)
+    list_select_related = ('news', 'author')
+    # Последние комментарии — по первичному ключу, без сортировки
+    # всей таблицы по created.
+    ordering = ('-pk',)
+
+    def save_model(self, request, obj, form, change):
+        """Отметка модерации скрывает или возвращает комментарий,
+        поэтому меняет счётчик комментариев и время изменения новости.
+        """
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            if 'flagged' in form.changed_data:
+                news = News.objects.filter(pk=obj.news_id)
+                if obj.flagged:
+                    news.change_comment_count(-1)
+                else:
+                    news.recount_comments()
+                news.touch()
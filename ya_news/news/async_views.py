@@ -0,0 +1,119 @@
+"""Асинхронные версии публичных страниц новостей для ASGI.
+
+Django 3.2 выполняет синхронные представления под ASGI через
+sync_to_async(thread_sensitive=True), то есть по очереди в одном общем
+потоке. Асинхронные версии главной страницы, страницы новости и
+отправки комментария передают запросы к БД и отрисовку шаблона одним
+заданием в пул из ASYNC_VIEW_THREADS потоков, а событийный цикл в это
+время обслуживает остальные соединения, в том числе медленных клиентов.
+У каждого потока пула своё соединение с БД, поэтому размер пула
+ограничивает и число соединений.
+
+Под WSGI AsyncViewsMiddleware исключается из цепочки, и запросы
+обслуживают обычные синхронные представления.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import close_old_connections
+
+from . import views
+
+THREAD_NAME_PREFIX = 'news-async'
+
+_executor = None
+_executor_size = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Пул потоков размера ASYNC_VIEW_THREADS, создаётся при первом
+    обращении и заново после смены настройки.
+    """
+    global _executor, _executor_size
+    size = settings.ASYNC_VIEW_THREADS
+    with _executor_lock:
+        if _executor_size != size:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            _executor = ThreadPoolExecutor(
+                max_workers=size, thread_name_prefix=THREAD_NAME_PREFIX
+            )
+            _executor_size = size
+        return _executor
+
+
+def _run(func, args, kwargs):
+    # Как обработчик запроса: соединение потока закрывается, если
+    # его срок по CONN_MAX_AGE истёк или оно сломано.
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_in_pool(func, *args, **kwargs):
+    """Выполняет синхронную функцию в пуле, не блокируя цикл событий."""
+    return await sync_to_async(
+        _run, thread_sensitive=False, executor=get_executor()
+    )(func, args, kwargs)
+
+
+def _respond(view, request, args, kwargs):
+    response = view(request, *args, **kwargs)
+    if callable(getattr(response, 'render', None)):
+        response.render()
+    return response
+
+
+def pooled(view):
+    """Асинхронная версия синхронного представления.
+
+    Ответ возвращается уже отрисованным: иначе Django отрисовал бы
+    TemplateResponse в общем потоке.
+    """
+    async def async_view(request, *args, **kwargs):
+        return await run_in_pool(_respond, view, request, args, kwargs)
+    return async_view
+
+
+NewsList = pooled(views.NewsList.as_view())
+# Страница новости вместе с отправкой комментария.
+NewsDetailView = pooled(views.NewsDetailView.as_view())
+
+ASYNC_VIEWS = {
+    'news:home': NewsList,
+    'news:detail': NewsDetailView,
+}
+
+
+class AsyncViewsMiddleware:
+    """Подменяет представления из ASYNC_VIEWS асинхронными версиями.
+
+    Должен стоять последним в MIDDLEWARE, чтобы проверки остальных
+    middleware, например CSRF, выполнялись до подмены.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not asyncio.iscoroutinefunction(get_response):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        # Так Django узнаёт асинхронный middleware; закрытый маркер
+        # asyncio в Python 3.12 удалён, поэтому отметку ставит asgiref.
+        markcoroutinefunction(self)
+
+    async def __call__(self, request):
+        return await self.get_response(request)
+
+    async def process_view(self, request, view_func, view_args, view_kwargs):
+        async_view = ASYNC_VIEWS.get(request.resolver_match.view_name)
+        if async_view is None:
+            return None
+        return await async_view(request, *view_args, **view_kwargs)
@@ -0,0 +1,92 @@
+"""Поиск запрещённых слов автоматом Ахо — Корасик.
+
+Автомат строится один раз по всему списку слов, после чего проверка
+текста занимает время, пропорциональное длине текста, а не
+произведению длины текста на число слов.
+"""
+
+
+class BadWordsMatcher:
+    """Проверяет, содержит ли текст хотя бы одно слово из списка."""
+
+    def __init__(self, words):
+        self._goto = [{}]
+        self._fail = [0]
+        self._terminal = [False]
+        for word in words:
+            self._add(word)
+        self._link()
+
+    def _add(self, word):
+        state = 0
+        for char in word:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._terminal.append(False)
+            state = next_state
+        self._terminal[state] = True
+
+    def _link(self):
+        """Строит суффиксные ссылки обходом в ширину."""
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[next_state] = (
+                    target if target != next_state else 0
+                )
+                if self._terminal[self._fail[next_state]]:
+                    self._terminal[next_state] = True
+
+    def search(self, text):
+        """True, если в text встречается хотя бы одно слово."""
+        goto, fail, terminal = self._goto, self._fail, self._terminal
+        if terminal[0]:
+            return True
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if terminal[state]:
+                return True
+        return False
+
+
+def read_words(path):
+    """Читает список слов из файла: одно слово на строку.
+
+    Пустые строки и строки, начинающиеся с #, пропускаются.
+    """
+    with open(path, encoding='utf-8') as file:
+        return [
+            line.strip() for line in file
+            if line.strip() and not line.startswith('#')
+        ]
+
+
+_worker_matcher = None
+
+
+def init_worker(words):
+    """Строит автомат в процессе-обработчике один раз."""
+    global _worker_matcher
+    _worker_matcher = BadWordsMatcher(words)
+
+
+def find_offenders(rows):
+    """Возвращает строки (pk, news_id), текст которых содержит
+    запрещённые слова. Вызывается в процессе-обработчике.
+    """
+    return [
+        (pk, news_id) for pk, news_id, text in rows
+        if _worker_matcher.search(text.lower())
+    ]
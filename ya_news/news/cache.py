@@ -0,0 +1,160 @@
+"""Кеш страниц новостей для анонимных пользователей.
+
+Ключи страниц версионируются: у главной страницы и у каждой новости
+есть свой счётчик версии, который увеличивается сигналами при
+изменении новостей и комментариев. Устаревшие страницы не удаляются,
+а перестают читаться и вытесняются по таймауту.
+
+Если настроены реплики, страница могла быть построена по данным,
+которые ещё не дошли до реплики. Поэтому в ключ входит и версия
+реплик, которую увеличивает команда sync_replicas.
+"""
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+HOME_VERSION_KEY = 'news:version:home'
+REPLICA_VERSION_KEY = 'news:version:replicas'
+CACHED_HEADERS = ('ETag', 'Last-Modified')
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def news_version_key(pk):
+    return f'news:version:news:{pk}'
+
+
+def get_version(version_key):
+    """Текущая версия; при отсутствии заводится новая уникальная.
+
+    Начальное значение берётся из времени, чтобы после вытеснения
+    счётчика из кеша версия не совпала ни с одной из прежних.
+    """
+    cache.add(version_key, time.time_ns(), timeout=None)
+    return cache.get(version_key)
+
+
+def bump_version(version_key):
+    try:
+        cache.incr(version_key)
+    except ValueError:
+        cache.set(version_key, time.time_ns(), timeout=None)
+
+
+def _count(event):
+    with _stats_lock:
+        _stats[event] += 1
+
+
+def cache_stats():
+    """Число попаданий и промахов кеша страниц в этом процессе."""
+    with _stats_lock:
+        return {'hits': _stats['hits'], 'misses': _stats['misses']}
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+class AnonymousPageCacheMixin:
+    """Отдаёт анонимным пользователям страницу из кеша.
+
+    Наследник определяет get_cache_version_key(): от какой версии
+    зависит страница.
+    """
+
+    def get_cache_version_key(self):
+        raise NotImplementedError
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method != 'GET' or request.user.is_authenticated:
+            return super().dispatch(request, *args, **kwargs)
+        version_key = self.get_cache_version_key()
+        version = get_version(version_key)
+        path_hash = hashlib.md5(request.get_full_path().encode()).hexdigest()
+        key = f'news:page:{version_key}:{path_hash}'
+        if settings.DATABASE_REPLICAS:
+            key = f'{key}:{get_version(REPLICA_VERSION_KEY)}'
+        cached = cache.get(key, version=version)
+        if cached is not None:
+            _count('hits')
+            content, headers = cached
+            response = HttpResponse(content)
+            for header, value in headers.items():
+                response[header] = value
+            return response
+        _count('misses')
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200 and hasattr(response, 'render'):
+            response.add_post_render_callback(
+                lambda rendered: cache.set(
+                    key,
+                    (rendered.content, {
+                        header: rendered[header]
+                        for header in CACHED_HEADERS
+                        if rendered.has_header(header)
+                    }),
+                    settings.NEWS_PAGE_CACHE_TIMEOUT,
+                    version=version,
+                )
+            )
+        return response
+
+
+class ConditionalGetMixin:
+    """Условные GET-запросы: ответ 304 без построения страницы.
+
+    Наследник определяет get_validators(), возвращающий пару
+    (строка для ETag, время последнего изменения) или None, если
+    объекта нет. Валидаторы вычисляются только для условных запросов
+    и для ответов, у которых ещё нет ETag: страница из кеша приносит
+    заголовки с собой.
+    """
+
+    def get_validators(self):
+        raise NotImplementedError
+
+    def _get_etag_and_last_modified(self):
+        validators = self.get_validators()
+        if validators is None:
+            return None, None
+        etag_source, last_modified = validators
+        user = self.request.user
+        if user.is_authenticated:
+            etag_source = f'{etag_source}:{user.pk}'
+        etag = quote_etag(hashlib.md5(etag_source.encode()).hexdigest())
+        return etag, int(last_modified.timestamp())
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        etag = last_modified = None
+        if (
+            'HTTP_IF_NONE_MATCH' in request.META
+            or 'HTTP_IF_MODIFIED_SINCE' in request.META
+        ):
+            etag, last_modified = self._get_etag_and_last_modified()
+            if etag is not None:
+                response = get_conditional_response(
+                    request, etag=etag, last_modified=last_modified
+                )
+                if response is not None:
+                    return response
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code != 200 or response.has_header('ETag'):
+            return response
+        if etag is None:
+            etag, last_modified = self._get_etag_and_last_modified()
+        if etag is not None:
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        return response
@@ -0,0 +1,132 @@
+"""Просмотры новостей и рейтинг самых читаемых.
+
+Просмотры копятся в памяти процесса и не чаще раза в
+NEWS_VIEWS_FLUSH_INTERVAL секунд записываются одной транзакцией,
+одним UPDATE на пачку новостей, поэтому чтение страниц не ждёт записи
+в SQLite на каждом запросе. Запись выполняет запрос, на котором
+истёк интервал, и atexit при остановке сервера; при аварийном
+завершении теряются просмотры последнего интервала.
+
+Рейтинг пересчитывается после каждой записи и хранится в кеше. Если
+порядок новостей в нём изменился, сбрасывается кеш главной страницы.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, transaction
+
+from .cache import HOME_VERSION_KEY, bump_version
+from .models import News
+
+MOST_READ_KEY = 'news:most_read'
+# Новостей в одном UPDATE: по три параметра на новость.
+FLUSH_BATCH_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+_counts = Counter()
+_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def record_view(news_id):
+    """Учитывает просмотр; раз в интервал записывает накопленное."""
+    global _last_flush
+    with _lock:
+        _counts[news_id] += 1
+        if time.monotonic() - _last_flush < settings.NEWS_VIEWS_FLUSH_INTERVAL:
+            return
+        _last_flush = time.monotonic()
+        counts = _take()
+    flush(counts)
+
+
+def _take():
+    counts = dict(_counts)
+    _counts.clear()
+    return counts
+
+
+def pending():
+    """Просмотры, ещё не записанные в БД."""
+    with _lock:
+        return dict(_counts)
+
+
+def reset():
+    global _last_flush
+    with _lock:
+        _counts.clear()
+        _last_flush = time.monotonic()
+
+
+def flush(counts=None):
+    """Записывает просмотры одной транзакцией и обновляет рейтинг.
+
+    Ошибки БД не доходят до запроса, на котором истёк интервал: если
+    запись не удалась, просмотры возвращаются в буфер до следующего
+    интервала.
+    """
+    if counts is None:
+        with _lock:
+            counts = _take()
+    if not counts:
+        return
+    ids = sorted(counts)
+    try:
+        with transaction.atomic():
+            for start in range(0, len(ids), FLUSH_BATCH_SIZE):
+                News.objects.add_views({
+                    pk: counts[pk]
+                    for pk in ids[start:start + FLUSH_BATCH_SIZE]
+                })
+    except DatabaseError:
+        logger.exception('Не удалось записать просмотры новостей.')
+        with _lock:
+            _counts.update(counts)
+        return
+    try:
+        refresh_most_read()
+    except DatabaseError:
+        # Просмотры записаны, рейтинг обновит следующая запись.
+        logger.exception('Не удалось обновить рейтинг новостей.')
+
+
+def flush_at_exit():
+    """Записывает остаток просмотров при остановке процесса.
+
+    Вызывается из точек входа сервера (wsgi.py, asgi.py), а не при
+    загрузке приложения: management-команды, например бенчмарки со
+    временной базой, к моменту выхода уже удалили свою БД.
+    """
+    atexit.register(flush)
+
+
+def refresh_most_read():
+    ranking = list(
+        News.objects.most_read(settings.NEWS_COUNT_IN_MOST_READ)
+        .values_list('pk', 'title')
+    )
+    previous = cache.get(MOST_READ_KEY)
+    cache.set(MOST_READ_KEY, ranking, timeout=None)
+    if previous is not None and previous != ranking:
+        bump_version(HOME_VERSION_KEY)
+    return ranking
+
+
+def most_read():
+    """Рейтинг из кеша: список пар (pk, заголовок)."""
+    ranking = cache.get(MOST_READ_KEY)
+    if ranking is None:
+        ranking = refresh_most_read()
+    return ranking
+
+
+def forget_most_read():
+    """Сбрасывает рейтинг, например после правки заголовка."""
+    cache.delete(MOST_READ_KEY)
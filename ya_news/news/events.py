@@ -0,0 +1,243 @@
+"""Поток новых комментариев к новости (server-sent events).
+
+Сохранённый комментарий после фиксации транзакции один раз
+отрисовывается в HTML-фрагмент и через общий для процесса broadcaster
+раздаётся всем подписчикам новости, так что открытые страницы не
+опрашивают БД. Под ASGI потоки обслуживает EventStreamRouter в цикле
+событий, не занимая потоков; под WSGI каждый поток событий занимает
+поток сервера на всё время подключения. Подписчики разных процессов
+друг о друге не знают.
+"""
+import asyncio
+import queue
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.http import Http404, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.urls import Resolver404, resolve
+from django.views import generic
+
+from .async_views import run_in_pool
+from .models import News
+
+EVENTS_VIEW_NAME = 'news:events'
+CONTENT_TYPE = 'text/event-stream; charset=utf-8'
+HEADERS = {
+    'Cache-Control': 'no-cache',
+    # Не даёт nginx буферизовать поток.
+    'X-Accel-Buffering': 'no',
+}
+PING = ': ping\n\n'
+# Через сколько миллисекунд браузер переподключается после обрыва.
+RETRY = 'retry: 3000\n\n'
+
+
+def format_event(event, data, event_id):
+    """Сообщение SSE; каждая строка данных идёт со своим префиксом."""
+    lines = [f'id: {event_id}', f'event: {event}']
+    lines.extend(f'data: {line}' for line in data.splitlines())
+    return '\n'.join(lines) + '\n\n'
+
+
+class Broadcaster:
+    """Подписчики потоков событий по новостям.
+
+    Подписчик — функция, которая принимает готовое сообщение и быстро
+    возвращает управление: publish() вызывает их под блокировкой.
+    """
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, news_id, deliver):
+        with self._lock:
+            self._subscribers[news_id].add(deliver)
+
+    def unsubscribe(self, news_id, deliver):
+        with self._lock:
+            subscribers = self._subscribers.get(news_id)
+            if subscribers is not None:
+                subscribers.discard(deliver)
+                if not subscribers:
+                    del self._subscribers[news_id]
+
+    def subscriber_count(self, news_id):
+        with self._lock:
+            return len(self._subscribers.get(news_id, ()))
+
+    def publish(self, news_id, message):
+        with self._lock:
+            for deliver in self._subscribers.get(news_id, ()):
+                deliver(message)
+
+
+broadcaster = Broadcaster()
+
+
+def publish_comment(comment):
+    """Отправляет новый комментарий подписчикам его новости."""
+    if not broadcaster.subscriber_count(comment.news_id):
+        return
+    html = render_to_string('news/comment_event.html', {'comment': comment})
+    broadcaster.publish(
+        comment.news_id, format_event('comment', html, comment.pk)
+    )
+
+
+class Subscription:
+    """Очередь сообщений одного подписчика.
+
+    Если подписчик не успевает забирать сообщения и в очереди их
+    набирается NEWS_EVENTS_QUEUE_SIZE, очередь закрывается (None),
+    поток обрывается, а браузер переподключается сам.
+    """
+
+    def __init__(self):
+        self.closed = False
+
+    def put(self, message):
+        if self.closed:
+            return
+        if self.queue.qsize() >= settings.NEWS_EVENTS_QUEUE_SIZE:
+            self.closed = True
+            message = None
+        self.queue.put_nowait(message)
+
+
+class ThreadSubscription(Subscription):
+    """Подписчик, который ждёт сообщений в своём потоке."""
+
+    def __init__(self):
+        super().__init__()
+        self.queue = queue.SimpleQueue()
+        self.deliver = self.put
+
+    def get(self, timeout):
+        """Следующее сообщение или PING, если за timeout их не было."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return PING
+
+
+class LoopSubscription(Subscription):
+    """Подписчик в цикле событий; сообщения передаются в цикл из
+    потока, сохранившего комментарий.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.queue = asyncio.Queue()
+        self.loop = asyncio.get_running_loop()
+
+    def deliver(self, message):
+        self.loop.call_soon_threadsafe(self.put, message)
+
+
+def iter_events(news_id):
+    """Поток событий для WSGI.
+
+    Подписка начинается с первой итерации, то есть когда сервер
+    начинает отправлять ответ, и заканчивается, когда сервер закрывает
+    ответ после отключения клиента.
+    """
+    subscription = ThreadSubscription()
+    broadcaster.subscribe(news_id, subscription.deliver)
+    try:
+        yield RETRY
+        while True:
+            message = subscription.get(settings.NEWS_EVENTS_PING_INTERVAL)
+            if message is None:
+                return
+            yield message
+    finally:
+        broadcaster.unsubscribe(news_id, subscription.deliver)
+
+
+class NewsEvents(generic.View):
+    """Новые комментарии к новости в виде server-sent events."""
+
+    def get(self, request, pk):
+        if not News.objects.filter(pk=pk).exists():
+            raise Http404('Новость не найдена.')
+        response = StreamingHttpResponse(
+            iter_events(pk), content_type=CONTENT_TYPE
+        )
+        for name, value in HEADERS.items():
+            response[name] = value
+        return response
+
+
+async def stream_events(scope, receive, send, news_id):
+    """Поток событий для ASGI: ждёт сообщений, не занимая потока."""
+    message = await receive()
+    while message['type'] == 'http.request' and message.get('more_body'):
+        message = await receive()
+    if message['type'] == 'http.disconnect':
+        return
+    if not await run_in_pool(News.objects.filter(pk=news_id).exists):
+        await send({'type': 'http.response.start', 'status': 404})
+        await send({'type': 'http.response.body'})
+        return
+    subscription = LoopSubscription()
+    broadcaster.subscribe(news_id, subscription.deliver)
+    disconnected = asyncio.ensure_future(receive())
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (name.lower().encode(), value.encode())
+                for name, value in (('Content-Type', CONTENT_TYPE),
+                                    *HEADERS.items())
+            ],
+        })
+        message = RETRY
+        while message is not None:
+            await send({
+                'type': 'http.response.body',
+                'body': message.encode(),
+                'more_body': True,
+            })
+            getter = asyncio.ensure_future(subscription.queue.get())
+            await asyncio.wait(
+                (getter, disconnected),
+                timeout=settings.NEWS_EVENTS_PING_INTERVAL,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if disconnected.done():
+                getter.cancel()
+                return
+            if getter.done():
+                message = getter.result()
+            else:
+                getter.cancel()
+                message = PING
+        await send({'type': 'http.response.body'})
+    finally:
+        broadcaster.unsubscribe(news_id, subscription.deliver)
+        disconnected.cancel()
+
+
+class EventStreamRouter:
+    """ASGI-приложение: потоки событий обслуживает само, остальные
+    запросы передаёт Django.
+    """
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            try:
+                match = resolve(scope['path'])
+            except Resolver404:
+                match = None
+            if match is not None and match.view_name == EVENTS_VIEW_NAME:
+                return await stream_events(
+                    scope, receive, send, match.kwargs['pk']
+                )
+        return await self.application(scope, receive, send)
@@ -0,0 +1,79 @@
+"""Потоковая выгрузка новостей и комментариев.
+
+Строки читаются из БД кортежами через iterator(), без создания моделей,
+и сразу сериализуются, поэтому память не зависит от размера выгрузки.
+Формат NDJSON совпадает с форматом команды import_news.
+"""
+import csv
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, News
+
+DATASETS = {
+    'news': (
+        'news.news',
+        News.objects.all(),
+        ('pk', 'title', 'text', 'date'),
+    ),
+    'comments': (
+        'news.comment',
+        Comment.objects.all(),
+        ('pk', 'news', 'parent', 'author__username', 'text', 'created'),
+    ),
+}
+FORMATS = {
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+class Echo:
+    """Псевдобуфер для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def iter_rows(dataset, since=None):
+    """Кортежи значений выгрузки в порядке первичного ключа, а с since —
+    в порядке создания: так строки читаются по индексу
+    comment_created_id_idx с первой подходящей.
+
+    Родительский комментарий старше ответа, поэтому в выгрузке он идёт
+    раньше, и import_news загружает его первым.
+    """
+    _, queryset, columns = DATASETS[dataset]
+    ordering = ('pk',)
+    if since is not None:
+        queryset = queryset.filter(created__gt=since)
+        ordering = ('created', 'pk')
+    return queryset.order_by(*ordering).values_list(*columns).iterator(
+        chunk_size=settings.EXPORT_CHUNK_SIZE
+    )
+
+
+def iter_ndjson(dataset, rows):
+    model, _, columns = DATASETS[dataset]
+    names = [column.replace('__username', '') for column in columns[1:]]
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for pk, *values in rows:
+        record = {'model': model, 'pk': pk, 'fields': dict(zip(names, values))}
+        yield encoder.encode(record) + '\n'
+
+
+def iter_csv(dataset, rows):
+    _, _, columns = DATASETS[dataset]
+    writer = csv.writer(Echo())
+    yield writer.writerow(
+        [column.replace('__username', '') for column in columns]
+    )
+    for row in rows:
+        yield writer.writerow(row)
+
+
+SERIALIZERS = {
+    'ndjson': iter_ndjson,
+    'csv': iter_csv,
+}
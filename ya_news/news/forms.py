@@ -1,6 +1,8 @@
-from django.forms import ModelForm
+from django.conf import settings
+from django.forms import HiddenInput, IntegerField, ModelForm
 from django.core.exceptions import ValidationError
 
+from .badwords import BadWordsMatcher, read_words
 from .models import Comment
 
 BAD_WORDS = (
@@ -9,6 +11,27 @@ BAD_WORDS = (
     # Дополните список на своё усмотрение.
 )
 WARNING = 'Не ругайтесь!'
+NO_PARENT = 'Комментарий, на который вы отвечаете, не найден.'
+TOO_DEEP = 'Ветка обсуждения слишком длинная, ответьте выше.'
+
+bad_words_matcher = None
+
+
+def get_bad_words():
+    """Слова из BAD_WORDS и из файла BAD_WORDS_FILE."""
+    words = list(BAD_WORDS)
+    if settings.BAD_WORDS_FILE:
+        words.extend(read_words(settings.BAD_WORDS_FILE))
+    return words
+
+
+def reload_bad_words():
+    """Перестраивает автомат запрещённых слов."""
+    global bad_words_matcher
+    bad_words_matcher = BadWordsMatcher(get_bad_words())
+
+
+reload_bad_words()
 
 
 class CommentForm(ModelForm):
@@ -20,8 +43,29 @@ class CommentForm(ModelForm):
     def clean_text(self):
         """Не позволяем ругаться в комментариях."""
         text = self.cleaned_data['text']
-        lowered_text = text.lower()
-        for word in BAD_WORDS:
-            if word in lowered_text:
-                raise ValidationError(WARNING)
+        if bad_words_matcher.search(text.lower()):
+            raise ValidationError(WARNING)
         return text
+
+
+class NewCommentForm(CommentForm):
+    """Новый комментарий к новости или ответ на её комментарий."""
+    parent = IntegerField(required=False, widget=HiddenInput)
+
+    def __init__(self, *args, news=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.news = news
+
+    def clean_parent(self):
+        """Родитель загружается одним запросом вместе с путём."""
+        parent_id = self.cleaned_data['parent']
+        if parent_id is None:
+            return None
+        parent = Comment.objects.filter(
+            news=self.news, pk=parent_id
+        ).only('pk', 'news_id', 'path').first()
+        if parent is None:
+            raise ValidationError(NO_PARENT)
+        if parent.depth + 1 >= Comment.MAX_DEPTH:
+            raise ValidationError(TOO_DEEP)
+        return parent
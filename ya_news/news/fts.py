@@ -0,0 +1,70 @@
+"""SQL поискового индекса FTS5 по новостям для миграций.
+
+SQLite меняет поля, пересоздавая таблицу news_news, и вместе со старой
+таблицей удаляет триггеры индекса. Поэтому миграция, меняющая
+news_news, должна вызвать create_search_triggers() после изменения
+(и при откате — перед ним); тест миграций проверяет, что триггеры
+на месте.
+"""
+FTS_TABLE = 'news_news_fts'
+
+TABLE_SQL = f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        title, text,
+        content='news_news', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+"""
+TRIGGERS = {
+    'news_news_fts_insert': f"""
+        CREATE TRIGGER news_news_fts_insert AFTER INSERT ON news_news BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, title, text)
+            VALUES (new.id, new.title, new.text);
+        END
+    """,
+    'news_news_fts_delete': f"""
+        CREATE TRIGGER news_news_fts_delete AFTER DELETE ON news_news BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, text)
+            VALUES ('delete', old.id, old.title, old.text);
+        END
+    """,
+    'news_news_fts_update': f"""
+        CREATE TRIGGER news_news_fts_update
+        AFTER UPDATE OF title, text ON news_news BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, text)
+            VALUES ('delete', old.id, old.title, old.text);
+            INSERT INTO {FTS_TABLE}(rowid, title, text)
+            VALUES (new.id, new.title, new.text);
+        END
+    """,
+}
+
+
+def create_search_index(apps, schema_editor):
+    """Таблица индекса, триггеры и индексация существующих новостей."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(TABLE_SQL)
+    create_search_triggers(apps, schema_editor)
+    schema_editor.execute(
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for name in TRIGGERS:
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {name}')
+    schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def create_search_triggers(apps, schema_editor):
+    """Пересоздаёт триггеры индекса, если таблицу news_news
+    пересоздали.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for name, sql in TRIGGERS.items():
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        schema_editor.execute(sql)
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from news.models import News
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает выдержки всех новостей, например после изменения '
+        'текста через update() или числа слов News.EXCERPT_WORDS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть положительным.')
+        updated = News.objects.refresh_excerpts(options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Обновлено выдержек: {updated}')
+        )
@@ -0,0 +1,257 @@
+import asyncio
+import json
+import random
+import socket
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from io import StringIO
+from pathlib import Path
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.test import override_settings
+from django.urls import reverse
+
+from news.models import News
+from perf.bench import benchmark_database
+from perf.stats import percentile
+
+HOST = '127.0.0.1'
+BACKLOG = 4096
+CHUNK_SIZE = 4096
+
+
+class QuietHandler(WSGIRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PooledWSGIServer(WSGIServer):
+    """WSGI-сервер с постоянным числом рабочих потоков.
+
+    Поток занят соединением от приёма заголовков до отправки ответа,
+    как у синхронных серверов с пулом потоков.
+    """
+    request_queue_size = BACKLOG
+
+    def __init__(self, threads):
+        super().__init__((HOST, 0), QuietHandler)
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_in_thread, request, client_address)
+
+    def process_in_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+def start_wsgi(threads):
+    server = PooledWSGIServer(threads)
+    server.set_app(get_wsgi_application())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def stop():
+        server.shutdown()
+        server.pool.shutdown()
+        server.server_close()
+
+    return server.server_address[1], stop
+
+
+async def serve_asgi(application, reader, writer):
+    """Одно соединение HTTP/1.1 без keep-alive на ASGI-приложении."""
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+        request_line, *lines = head.decode('latin-1').split('\r\n')[:-2]
+        method, target, _ = request_line.split(' ', 2)
+        path, _, query = target.partition('?')
+        headers = [
+            (name.strip().lower().encode(), value.strip().encode())
+            for name, _, value in (line.partition(':') for line in lines)
+        ]
+        length = int(dict(headers).get(b'content-length', 0))
+        body = await reader.readexactly(length)
+
+        async def receive():
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                writer.write(
+                    b'HTTP/1.1 %d \r\n' % message['status']
+                    + b''.join(
+                        name + b': ' + value + b'\r\n'
+                        for name, value in message['headers']
+                    )
+                    + b'Connection: close\r\n\r\n'
+                )
+            else:
+                writer.write(message.get('body', b''))
+                await writer.drain()
+
+        await application({
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': method,
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': query.encode(),
+            'root_path': '',
+            'headers': headers,
+            'client': writer.get_extra_info('peername'),
+            'server': writer.get_extra_info('sockname'),
+        }, receive, send)
+    finally:
+        writer.close()
+
+
+def start_asgi():
+    application = get_asgi_application()
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(asyncio.start_server(
+        partial(serve_asgi, application), HOST, 0, backlog=BACKLOG
+    ))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    def stop():
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        server.close()
+        loop.run_until_complete(server.wait_closed())
+        loop.close()
+
+    return server.sockets[0].getsockname()[1], stop
+
+
+async def slow_get(port, path, delay):
+    """GET, ответ на который клиент читает по CHUNK_SIZE байт с паузой
+    delay секунд, как медленное мобильное соединение. Маленький
+    приёмный буфер не даёт ядру принять весь ответ за клиента.
+    """
+    sock = socket.socket()
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, CHUNK_SIZE)
+    sock.setblocking(False)
+    await asyncio.get_running_loop().sock_connect(sock, (HOST, port))
+    reader, writer = await asyncio.open_connection(sock=sock, limit=CHUNK_SIZE)
+    writer.write(
+        f'GET {path} HTTP/1.1\r\nHost: localhost\r\n'
+        'Connection: close\r\n\r\n'.encode()
+    )
+    response = b''
+    while chunk := await reader.read(CHUNK_SIZE):
+        response += chunk
+        await asyncio.sleep(delay)
+    writer.close()
+    return int(response.split(b' ', 2)[1])
+
+
+async def load(port, paths, clients, requests, delay, seed):
+    """Запросы от clients одновременных медленных клиентов. Возвращает
+    задержки в миллисекундах и число ошибок.
+    """
+    rnd = random.Random(seed)
+    latencies = []
+    errors = 0
+    remaining = requests
+
+    async def client():
+        nonlocal errors, remaining
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            try:
+                status = await slow_get(port, rnd.choice(paths), delay)
+            except OSError:
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+            if status >= 400:
+                errors += 1
+
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return latencies, errors
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность публичных страниц новостей '
+        'под WSGI-сервером с пулом потоков и под ASGI с асинхронными '
+        'представлениями при множестве медленных клиентов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=200)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument(
+            '--delay', type=float, default=0.01,
+            help='Пауза клиента между порциями ответа, секунды.',
+        )
+        parser.add_argument(
+            '--threads', type=int, default=8,
+            help='Потоки WSGI-сервера и ASYNC_VIEW_THREADS.',
+        )
+        parser.add_argument('--news', type=int, default=1000)
+        parser.add_argument('--comments', type=int, default=20_000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', type=Path)
+
+    def handle(self, *args, **options):
+        settings.DEBUG = False
+        servers = {
+            'wsgi': partial(start_wsgi, options['threads']),
+            'asgi': start_asgi,
+        }
+        results = {}
+        with benchmark_database(), \
+                override_settings(ASYNC_VIEW_THREADS=options['threads']):
+            call_command(
+                'seed', news=options['news'], comments=options['comments'],
+                seed=options['seed'], stdout=StringIO(),
+            )
+            paths = [reverse('news:home')] + [
+                reverse('news:detail', args=(pk,))
+                for pk in News.objects.values_list('pk', flat=True)[:100]
+            ]
+            for name, start in servers.items():
+                port, stop = start()
+                try:
+                    started = time.perf_counter()
+                    latencies, errors = asyncio.run(load(
+                        port, paths, options['clients'], options['requests'],
+                        options['delay'], options['seed'],
+                    ))
+                    elapsed = time.perf_counter() - started
+                finally:
+                    stop()
+                results[name] = {
+                    'requests': len(latencies),
+                    'errors': errors,
+                    'rps': round(len(latencies) / elapsed, 1),
+                    'mean': round(statistics.fmean(latencies), 3),
+                    'p50': round(percentile(latencies, 0.5), 3),
+                    'p95': round(percentile(latencies, 0.95), 3),
+                }
+        for name, row in results.items():
+            self.stdout.write(
+                f'{name:<6}{row["rps"]:>10} req/s{row["p50"]:>12} мс p50'
+                f'{row["p95"]:>12} мс p95  ошибок: {row["errors"]}'
+            )
+        if options['output']:
+            options['output'].write_text(json.dumps(results, indent=2))
@@ -0,0 +1,75 @@
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand
+
+from news.badwords import BadWordsMatcher
+
+
+TEXT_LETTERS = string.ascii_lowercase.replace('z', '')
+
+
+def random_word(rnd, min_length, max_length):
+    length = rnd.randint(min_length, max_length)
+    return ''.join(rnd.choice(TEXT_LETTERS) for _ in range(length))
+
+
+def random_bad_word(rnd):
+    """Слово с буквой z, которой нет в тексте комментариев.
+
+    Комментарии не содержат запрещённых слов, поэтому обе проверки
+    просматривают текст целиком — это худший случай.
+    """
+    word = random_word(rnd, 3, 11)
+    position = rnd.randint(0, len(word))
+    return word[:position] + 'z' + word[position:]
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает автомат запрещённых слов с прямым перебором '
+        'на синтетическом словаре и комментариях.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--words', type=int, default=50_000)
+        parser.add_argument('--size', type=int, default=10 * 1024)
+        parser.add_argument('--comments', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['seed'])
+        words = list({random_bad_word(rnd) for _ in range(options['words'])})
+        comments = []
+        for _ in range(options['comments']):
+            text = []
+            while sum(map(len, text)) < options['size']:
+                text.append(random_word(rnd, 1, 10))
+            comments.append(' '.join(text)[:options['size']])
+
+        started = time.perf_counter()
+        matcher = BadWordsMatcher(words)
+        build_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        automaton_result = [matcher.search(text) for text in comments]
+        automaton_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        naive_result = [
+            any(word in text for word in words) for text in comments
+        ]
+        naive_time = time.perf_counter() - started
+
+        if automaton_result != naive_result:
+            self.stderr.write(self.style.ERROR('Результаты не совпадают!'))
+            return
+        count = len(comments)
+        self.stdout.write(
+            f'Слов: {len(words)}, комментариев: {count} '
+            f'по {options["size"]} символов\n'
+            f'Построение автомата: {build_time:.3f} с\n'
+            f'Автомат: {automaton_time / count * 1000:.2f} мс/комментарий\n'
+            f'Перебор: {naive_time / count * 1000:.2f} мс/комментарий'
+        )
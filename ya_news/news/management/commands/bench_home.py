@@ -0,0 +1,130 @@
+import json
+import statistics
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+
+from news.models import Comment, News
+from perf.bench import Scenario, benchmark_database, run_scenario
+from perf.seeding import BulkLoader, fast_sqlite
+from perf.stats import percentile
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет отдельную базу новостями главной страницы с большим '
+        'числом комментариев и сравнивает получение данных главной '
+        'страницы до денормализации (подгрузка комментариев через '
+        'prefetch_related) и после (поле comment_count), а также '
+        'измеряет задержку всей страницы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--comments-per-news', type=int, default=10_000)
+        parser.add_argument('--requests', type=int, default=20)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--output', type=Path)
+
+    def handle(self, *args, **options):
+        # Отладочный режим копит все SQL-запросы в памяти и искажает замер.
+        settings.DEBUG = False
+        requests = options['requests']
+        results = {}
+        with benchmark_database():
+            user = self.seed(options)
+            results['до: prefetch_related'] = self.measure(
+                self.prefetched, requests
+            )
+            results['после: comment_count'] = self.measure(
+                self.denormalized, requests
+            )
+            # Авторизованный пользователь: анонимному страницу отдал бы
+            # кеш страниц, не обращаясь к БД.
+            page = run_scenario(
+                get_wsgi_application(),
+                Scenario('news:home', reverse('news:home'), user),
+                requests, 1,
+            )
+            results['страница'] = {
+                key: page[key] for key in ('mean', 'p50', 'p95')
+            }
+        for name, row in results.items():
+            self.stdout.write(
+                f'{name:<24}{row["mean"]:>10} мс{row["p50"]:>10} p50'
+                f'{row["p95"]:>10} p95'
+            )
+        if options['output']:
+            options['output'].write_text(json.dumps(results, indent=2))
+
+    def seed(self, options):
+        """Новости главной страницы, у каждой comments_per_news
+        комментариев одного пользователя.
+        """
+        loader = BulkLoader(self.stdout, options['batch_size'])
+        user = User.objects.create(username='bench')
+        count = settings.NEWS_COUNT_ON_HOME_PAGE
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        with fast_sqlite():
+            loader.load(News, (
+                News(title=f'Новость {index}', text='Текст новости.')
+                for index in range(count)
+            ))
+            loader.insert(
+                Comment,
+                (
+                    'news', 'author', 'text', 'created', 'updated',
+                    'flagged', 'path',
+                ),
+                (
+                    (news_id, user.pk, 'Комментарий', now, now, False, '')
+                    for news_id in News.objects.values_list('pk', flat=True)
+                    for _ in range(options['comments_per_news'])
+                ),
+            )
+            Comment.objects.fill_paths()
+            News.objects.recount_comments()
+        return user
+
+    @staticmethod
+    def prefetched():
+        """Как главная страница до поля comment_count: комментарии всех
+        новостей загружаются, чтобы вывести их число.
+        """
+        return [
+            len(news.comment_set.all())
+            for news in News.objects.prefetch_related('comment_set')[
+                :settings.NEWS_COUNT_ON_HOME_PAGE
+            ]
+        ]
+
+    @staticmethod
+    def denormalized():
+        """Как главная страница сейчас: один запрос без комментариев."""
+        return [
+            news.comment_count
+            for news in News.objects.defer('text')[
+                :settings.NEWS_COUNT_ON_HOME_PAGE
+            ]
+        ]
+
+    @staticmethod
+    def measure(function, repeats):
+        latencies = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            function()
+            latencies.append((time.perf_counter() - started) * 1000)
+        return {
+            'mean': round(statistics.fmean(latencies), 3),
+            'p50': round(percentile(latencies, 0.5), 3),
+            'p95': round(percentile(latencies, 0.95), 3),
+        }
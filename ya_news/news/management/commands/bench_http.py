@@ -0,0 +1,94 @@
+import random
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+
+from news.models import Comment, News
+from perf.bench import BaseBenchmarkCommand, Scenario
+
+User = get_user_model()
+
+
+class Command(BaseBenchmarkCommand):
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--news', type=int, default=1000)
+        parser.add_argument('--comments-per-news', type=int, default=20)
+        parser.add_argument('--users', type=int, default=100)
+
+    def seed(self, options):
+        today = timezone.now().date()
+        User.objects.bulk_create(
+            User(username=f'user{index}', is_staff=index == 0)
+            for index in range(options['users'])
+        )
+        users = list(User.objects.order_by('pk'))
+        News.objects.bulk_create(
+            (
+                News(
+                    title=f'Новость {index}',
+                    text='Текст новости. ' * 50,
+                    date=today - timedelta(days=index // 3),
+                    trending_score=random.random() * 10,
+                )
+                for index in range(options['news'])
+            ),
+            batch_size=1000,
+        )
+        news_ids = list(News.objects.values_list('pk', flat=True))
+        Comment.objects.bulk_create(
+            (
+                Comment(
+                    news_id=news_id,
+                    author=random.choice(users),
+                    text=f'Комментарий {index}',
+                )
+                for news_id in news_ids
+                for index in range(options['comments_per_news'])
+            ),
+            batch_size=1000,
+        )
+        News.objects.recount_comments()
+
+        news = News.objects.first()
+        comment = Comment.objects.filter(news=news).first()
+        staff = users[0]
+        search_query = urlencode({'q': 'текст новости'})
+        return [
+            Scenario('news:home', reverse('news:home')),
+            Scenario('news:archive', reverse('news:archive')),
+            # Оба слова есть в каждой новости: худший случай для ранжирования.
+            Scenario(
+                'news:search',
+                f"{reverse('news:search')}?{search_query}",
+            ),
+            Scenario('news:trending', reverse('news:trending')),
+            Scenario('news:detail', reverse('news:detail', args=(news.pk,))),
+            Scenario(
+                'news:detail (auth)',
+                reverse('news:detail', args=(news.pk,)),
+                comment.author,
+            ),
+            Scenario(
+                'news:comments', reverse('news:comments', args=(news.pk,))
+            ),
+            Scenario(
+                'news:edit',
+                reverse('news:edit', args=(comment.pk,)),
+                comment.author,
+            ),
+            Scenario(
+                'news:delete',
+                reverse('news:delete', args=(comment.pk,)),
+                comment.author,
+            ),
+            Scenario(
+                'news:export',
+                reverse('news:export', args=('news',)),
+                staff,
+            ),
+        ]
@@ -0,0 +1,29 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Count
+from django.urls import reverse
+
+from news.models import News
+from perf.bench import BaseRenderBenchmarkCommand
+
+
+class Command(BaseRenderBenchmarkCommand):
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--comments', type=int, default=1000)
+
+    def seed(self, options):
+        call_command(
+            'seed', users=20, news=20, comments=options['comments'],
+            stdout=StringIO(),
+        )
+        news = News.objects.annotate(
+            total=Count('comment')
+        ).order_by('-total').first()
+        user = news.comment_set.select_related('author').first().author
+        return [
+            ('news:home', reverse('news:home'), user),
+            ('news:detail', reverse('news:detail', args=(news.pk,)), user),
+        ]
@@ -0,0 +1,122 @@
+import json
+import random
+import statistics
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from news.models import News
+from news.search import search
+from perf.bench import benchmark_database
+from perf.seeding import BulkLoader, fast_sqlite, zipf_weights
+from perf.stats import percentile
+
+SYLLABLES = (
+    'ба', 'ве', 'ги', 'до', 'жу', 'за', 'ки', 'ло', 'ме', 'ну',
+    'по', 'ра', 'се', 'ти', 'фу', 'хо', 'це', 'ша', 'щи', 'ям',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет отдельную базу новостями из случайных слов с частотами '
+        'по закону Ципфа и сравнивает поиск через FTS5 с icontains по '
+        'частым, средним и редким словам.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--news', type=int, default=1_000_000)
+        parser.add_argument('--words', type=int, default=40)
+        parser.add_argument('--vocabulary', type=int, default=50_000)
+        parser.add_argument('--queries', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--output', type=Path)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['seed'])
+        vocabulary = self.vocabulary(rnd, options['vocabulary'])
+        results = {}
+        with benchmark_database():
+            loader = BulkLoader(self.stdout, options['batch_size'])
+            with fast_sqlite():
+                loader.insert(
+                    News,
+                    ('title', 'text', 'excerpt', 'date', 'comment_count',
+                     'view_count', 'trending_score', 'updated'),
+                    self.rows(rnd, vocabulary, options),
+                )
+            results['load_rows_per_min'] = round(loader.rate())
+            # Слова разной частоты: начало словаря встречается чаще.
+            size = len(vocabulary)
+            groups = {
+                'частые': vocabulary[:10],
+                'средние': vocabulary[size // 100:size // 100 + 100],
+                'редкие': vocabulary[-1000:],
+            }
+            for group, words in groups.items():
+                queries = rnd.choices(words, k=options['queries'])
+                results[group] = {
+                    'fts5': self.measure(lambda q: search(q, 0, 10), queries),
+                    'icontains': self.measure(self.icontains, queries),
+                }
+        self.stdout.write(
+            f'Загрузка: {results["load_rows_per_min"]} строк/мин'
+        )
+        for group in groups:
+            for method, row in results[group].items():
+                self.stdout.write(
+                    f'{group:<10}{method:<12}{row["p50"]:>12} мс p50'
+                    f'{row["p95"]:>12} мс p95'
+                )
+        if options['output']:
+            options['output'].write_text(json.dumps(results, indent=2))
+
+    @staticmethod
+    def vocabulary(rnd, size):
+        words = set()
+        while len(words) < size:
+            words.add(''.join(rnd.choices(SYLLABLES, k=rnd.randint(2, 5))))
+        words = sorted(words)
+        rnd.shuffle(words)
+        return words
+
+    @staticmethod
+    def rows(rnd, vocabulary, options):
+        cum_weights = zipf_weights(len(vocabulary), 1.0)
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        today = timezone.localdate()
+        for index in range(options['news']):
+            words = rnd.choices(
+                vocabulary, cum_weights=cum_weights, k=options['words'] + 5
+            )
+            text = ' '.join(words[5:])
+            yield (
+                ' '.join(words[:5]), text, ' '.join(words[5:20]) + ' …',
+                str(today), 0, 0, 0, now,
+            )
+
+    @staticmethod
+    def icontains(query):
+        return list(
+            News.objects.filter(
+                Q(title__icontains=query) | Q(text__icontains=query)
+            ).only('pk', 'title', 'date')[:10]
+        )
+
+    @staticmethod
+    def measure(function, queries):
+        latencies = []
+        for query in queries:
+            started = time.perf_counter()
+            function(query)
+            latencies.append((time.perf_counter() - started) * 1000)
+        return {
+            'mean': round(statistics.fmean(latencies), 3),
+            'p50': round(percentile(latencies, 0.5), 3),
+            'p95': round(percentile(latencies, 0.95), 3),
+        }
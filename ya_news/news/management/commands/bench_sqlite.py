@@ -0,0 +1,66 @@
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import transaction
+
+from news.models import Comment, News
+from news.pagination import keyset_page
+from news.views import CommentsPageMixin
+from perf.bench import BaseMixedBenchmarkCommand
+
+User = get_user_model()
+
+
+class Command(BaseMixedBenchmarkCommand):
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--news', type=int, default=1000)
+        parser.add_argument('--comments', type=int, default=50_000)
+        parser.add_argument('--users', type=int, default=100)
+
+    def seed(self, options):
+        call_command(
+            'seed', users=options['users'], news=options['news'],
+            comments=options['comments'], seed=options['seed'],
+            stdout=StringIO(),
+        )
+        news_ids = list(News.objects.values_list('pk', flat=True))
+        user_ids = list(User.objects.values_list('pk', flat=True))
+
+        def read(rnd):
+            """Новость, первая и следующая страницы комментариев в
+            порядке путей, как NewsDetail и «показать ещё».
+            """
+            news_id = rnd.choice(news_ids)
+            News.objects.get(pk=news_id)
+            comments = Comment.objects.thread(news_id).filter(
+                flagged=False
+            ).select_related('author')
+            _, cursor = keyset_page(
+                comments,
+                CommentsPageMixin.comments_ordering,
+                settings.COMMENTS_COUNT_ON_PAGE,
+            )
+            if cursor:
+                keyset_page(
+                    comments,
+                    CommentsPageMixin.comments_ordering,
+                    settings.COMMENTS_COUNT_ON_PAGE,
+                    cursor,
+                )
+
+        def write(rnd):
+            """Новый комментарий и счётчик, как NewsComment."""
+            news_id = rnd.choice(news_ids)
+            with transaction.atomic():
+                Comment.objects.create(
+                    news_id=news_id,
+                    author_id=rnd.choice(user_ids),
+                    text='Комментарий из прогона',
+                )
+                News.objects.filter(pk=news_id).change_comment_count(1)
+
+        return read, write
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from news.cache import HOME_VERSION_KEY, bump_version
+from news.models import News
+
+
+class Command(BaseCommand):
+    help = (
+        'Уменьшает рейтинг обсуждаемых новостей за прошедший интервал. '
+        'Запускается по расписанию раз в NEWS_TRENDING_DECAY_INTERVAL '
+        'секунд; за NEWS_TRENDING_HALF_LIFE секунд рейтинг убывает вдвое.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float,
+            help='Сколько секунд прошло с прошлого запуска, по умолчанию '
+                 'NEWS_TRENDING_DECAY_INTERVAL.',
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        if interval is None:
+            interval = settings.NEWS_TRENDING_DECAY_INTERVAL
+        factor = 0.5 ** (interval / settings.NEWS_TRENDING_HALF_LIFE)
+        updated = News.objects.decay_trending(
+            factor, settings.NEWS_TRENDING_MIN_SCORE
+        )
+        bump_version(HOME_VERSION_KEY)
+        self.stdout.write(
+            self.style.SUCCESS(f'Обновлён рейтинг новостей: {updated}')
+        )
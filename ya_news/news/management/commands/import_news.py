@@ -0,0 +1,210 @@
+import json
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from news.cache import HOME_VERSION_KEY, news_version_key
+from news.models import Comment, News
+from news.signals import bump_versions
+
+User = get_user_model()
+
+MODELS = {
+    'news.news': News,
+    'news.comment': Comment,
+}
+
+
+@contextmanager
+def preserve_timestamps():
+    """Отключает auto_now/auto_now_add, чтобы сохранить даты из дампа.
+
+    Возвращает список отключённых полей: если в строке дампа даты нет,
+    её нужно заполнить самостоятельно.
+    """
+    fields = [
+        field for model in MODELS.values()
+        for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield fields
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает новости и комментарии из JSONL-дампа. Каждая строка — '
+        'объект в формате фикстур Django: {"model": "news.news", '
+        '"pk": 1, "fields": {...}} или {"model": "news.comment", '
+        '"pk": 2, "fields": {"news": 1, "parent": null, '
+        '"author": "username", ...}}. Родительский комментарий должен '
+        'идти в дампе раньше ответов или уже быть в базе.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть положительным.')
+        self.batch_size = options['batch_size']
+        self.imported = self.skipped = 0
+        started = time.perf_counter()
+        batch = []
+        with open(options['path'], encoding='utf-8') as file, \
+                preserve_timestamps() as self.timestamp_fields:
+            for line_number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                batch.append((line_number, line))
+                if len(batch) >= self.batch_size:
+                    self.import_batch(batch)
+                    batch = []
+                    self.report(started, ending='\r')
+            if batch:
+                self.import_batch(batch)
+        self.report(started)
+
+    def report(self, started, ending='\n'):
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        self.stdout.write(
+            f'Загружено: {self.imported}, пропущено: {self.skipped}, '
+            f'{(self.imported + self.skipped) / elapsed:.0f} строк/с',
+            ending=ending,
+        )
+
+    def skip(self, line_number, error):
+        self.skipped += 1
+        self.stderr.write(f'Строка {line_number}: {error}')
+
+    def parse(self, batch):
+        """Разбирает строки пачки на новости и комментарии."""
+        news, comments = [], []
+        for line_number, line in batch:
+            try:
+                record = json.loads(line)
+                model = MODELS[record['model']]
+                fields = dict(record['fields'])
+            except (ValueError, KeyError, TypeError) as error:
+                self.skip(line_number, f'некорректная запись ({error!r})')
+                continue
+            if model is News:
+                news.append((line_number, record.get('pk'), fields))
+            else:
+                comments.append((line_number, record.get('pk'), fields))
+        return news, comments
+
+    def build(self, model, line_number, fields, exclude=()):
+        """Создаёт объект и проверяет поля без запросов к БД."""
+        try:
+            obj = model(**fields)
+            obj.clean_fields(exclude=exclude)
+        except (TypeError, ValueError, ValidationError) as error:
+            self.skip(line_number, error)
+            return None
+        for field in self.timestamp_fields:
+            if field.model is model and getattr(obj, field.attname) is None:
+                setattr(obj, field.attname, self.now)
+        return obj
+
+    @staticmethod
+    def by_depth(comments):
+        """Делит комментарии на слои: каждый ответ на комментарий из
+        этой же пачки попадает в слой после родителя.
+
+        bulk_create строит путь ответа из пути родителя, поэтому слои
+        вставляются по очереди.
+        """
+        layers, depths = [], {}
+        for obj in comments:
+            depth = depths.get(obj.parent_id, -1) + 1
+            if obj.pk is not None:
+                depths[obj.pk] = depth
+            if depth == len(layers):
+                layers.append([])
+            layers[depth].append(obj)
+        return layers
+
+    def import_batch(self, batch):
+        self.now = timezone.now()
+        news_rows, comment_rows = self.parse(batch)
+        news_objects = [
+            obj for obj in (
+                self.build(News, line_number, {'pk': pk, **fields})
+                for line_number, pk, fields in news_rows
+            ) if obj is not None
+        ]
+
+        # Авторы и новости комментариев пачки ищутся одним запросом.
+        usernames = {fields.get('author') for _, _, fields in comment_rows}
+        authors = dict(
+            User.objects.filter(username__in=usernames)
+            .values_list('username', 'pk')
+        )
+        news_ids = {fields.get('news') for _, _, fields in comment_rows}
+        known_news = {obj.pk for obj in news_objects if obj.pk} | set(
+            News.objects.filter(pk__in=news_ids).values_list('pk', flat=True)
+        )
+        # Родитель ответа ищется в базе и среди принятых строк пачки;
+        # ключ — новость родителя, ответ должен относиться к ней же.
+        parent_ids = {fields.get('parent') for _, _, fields in comment_rows}
+        parent_news = dict(
+            Comment.objects.filter(pk__in=parent_ids - {None})
+            .values_list('pk', 'news_id')
+        )
+
+        comment_objects = []
+        for line_number, pk, fields in comment_rows:
+            username = fields.pop('author', None)
+            news_id = fields.pop('news', None)
+            parent_id = fields.pop('parent', None)
+            if username not in authors:
+                self.skip(line_number, f'нет пользователя {username!r}')
+                continue
+            if news_id not in known_news:
+                self.skip(line_number, f'нет новости {news_id!r}')
+                continue
+            if parent_id is not None and parent_news.get(parent_id) != news_id:
+                self.skip(
+                    line_number,
+                    f'нет комментария {parent_id!r} к новости {news_id!r}',
+                )
+                continue
+            obj = self.build(
+                Comment, line_number,
+                {
+                    **fields, 'pk': pk, 'news_id': news_id,
+                    'author_id': authors[username], 'parent_id': parent_id,
+                },
+                exclude=('news', 'author', 'parent'),
+            )
+            if obj is not None:
+                comment_objects.append(obj)
+                if obj.pk is not None:
+                    parent_news[obj.pk] = news_id
+
+        touched_news = {obj.news_id for obj in comment_objects}
+        with transaction.atomic():
+            News.objects.bulk_create(news_objects)
+            for layer in self.by_depth(comment_objects):
+                Comment.objects.bulk_create(layer)
+            News.objects.filter(pk__in=touched_news).recount_comments()
+            # bulk_create не отправляет сигналы, поэтому версии кеша
+            # страниц сбрасываются явно.
+            bump_versions(
+                HOME_VERSION_KEY, *map(news_version_key, touched_news)
+            )
+        self.imported += len(news_objects) + len(comment_objects)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from news.search import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        'Перестраивает полнотекстовый индекс новостей, например после '
+        'записи в news_news в обход триггеров или восстановления из дампа.'
+    )
+
+    def handle(self, *args, **options):
+        rebuild()
+        self.stdout.write(self.style.SUCCESS('Индекс поиска перестроен.'))
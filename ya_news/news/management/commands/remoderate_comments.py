@@ -0,0 +1,131 @@
+import os
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from news.badwords import find_offenders, init_worker
+from news.cache import HOME_VERSION_KEY, news_version_key
+from news.forms import get_bad_words
+from news.models import Comment, News
+from news.signals import bump_versions
+
+
+class Command(BaseCommand):
+    help = (
+        'Перепроверяет сохранённые комментарии по текущему списку '
+        'запрещённых слов и помечает или удаляет нарушителей.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--action', choices=('flag', 'delete'), default='flag',
+        )
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--workers', type=int, default=None)
+        parser.add_argument(
+            '--checkpoint',
+            type=Path,
+            help='Файл, в котором хранится pk последнего проверенного '
+                 'комментария. Если файл есть, проверка продолжается с него.',
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size должен быть положительным.')
+        self.options = options
+        checkpoint = options['checkpoint']
+        last_pk = 0
+        if checkpoint and checkpoint.exists():
+            last_pk = int(checkpoint.read_text())
+            self.stdout.write(f'Продолжаем после pk={last_pk}')
+
+        self.scanned = self.offenders = 0
+        self.started = time.perf_counter()
+        workers = options['workers'] or os.cpu_count()
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=init_worker,
+            initargs=(get_bad_words(),),
+        ) as executor:
+            # Число чанков в работе ограничено, поэтому память не растёт
+            # с размером таблицы. Результаты обрабатываются по порядку,
+            # чтобы контрольная точка не обгоняла непроверенные строки.
+            in_flight = deque()
+            for chunk in self.iter_chunks(last_pk, options['chunk_size']):
+                in_flight.append((
+                    chunk[-1][0],
+                    len(chunk),
+                    executor.submit(find_offenders, chunk),
+                ))
+                if len(in_flight) >= workers * 2:
+                    self.apply_result(*in_flight.popleft())
+            while in_flight:
+                self.apply_result(*in_flight.popleft())
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено: {self.scanned}, нарушений: {self.offenders}, '
+            f'{self.rate():.0f} строк/с'
+        ))
+
+    def iter_chunks(self, last_pk, chunk_size):
+        """Комментарии диапазонами по pk, без загрузки моделей."""
+        while True:
+            chunk = list(
+                Comment.objects.filter(pk__gt=last_pk).order_by('pk')
+                .values_list('pk', 'news_id', 'text')[:chunk_size]
+                .iterator(chunk_size=chunk_size)
+            )
+            if not chunk:
+                return
+            yield chunk
+            last_pk = chunk[-1][0]
+
+    def apply_result(self, last_pk, size, future):
+        found = future.result()
+        if found:
+            self.punish(found, self.options['action'])
+        if self.options['checkpoint']:
+            self.options['checkpoint'].write_text(str(last_pk))
+        self.scanned += size
+        self.offenders += len(found)
+        if self.options['verbosity'] > 1:
+            self.stdout.write(
+                f'pk<={last_pk}: проверено {self.scanned}, '
+                f'нарушений {self.offenders}, {self.rate():.0f} строк/с'
+            )
+
+    def punish(self, found, action):
+        pks = [pk for pk, _ in found]
+        news_ids = {news_id for _, news_id in found}
+        with transaction.atomic():
+            if action == 'flag':
+                # Скрытые комментарии выходят из счётчика новости; уже
+                # помеченные при повторной проверке не вычитаются.
+                hidden = Counter(
+                    Comment.objects.filter(pk__in=pks, flagged=False)
+                    .values_list('news_id', flat=True)
+                )
+                Comment.objects.filter(pk__in=pks).update(flagged=True)
+                for news_id, count in hidden.items():
+                    News.objects.filter(
+                        pk=news_id
+                    ).change_comment_count(-count)
+                # update() не отправляет сигналы, поэтому страницы
+                # новостей со скрытыми комментариями сбрасываются явно,
+                # а время изменения новостей обновляется для условных
+                # запросов.
+                News.objects.filter(pk__in=news_ids).touch()
+                bump_versions(
+                    HOME_VERSION_KEY, *map(news_version_key, news_ids)
+                )
+                return
+            Comment.objects.filter(pk__in=pks).delete()
+            News.objects.filter(pk__in=news_ids).recount_comments()
+
+    def rate(self):
+        """Пропускная способность: проверенных строк в секунду."""
+        return self.scanned / max(time.perf_counter() - self.started, 1e-9)
@@ -0,0 +1,131 @@
+import random
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from news.cache import HOME_VERSION_KEY
+from news.models import Comment, News
+from news.signals import bump_versions
+from perf.seeding import (
+    BulkLoader,
+    fast_sqlite,
+    naive_now,
+    next_number,
+    zipf_weights,
+)
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, новостями и '
+        'комментариями. Число комментариев к новостям распределено по '
+        'закону Ципфа: --skew 0 даёт равномерное распределение. '
+        'При одинаковом --seed данные совпадают.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--news', type=int, default=10_000)
+        parser.add_argument('--comments', type=int, default=1_000_000)
+        parser.add_argument('--skew', type=float, default=1.0)
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько последних дней распределяются даты.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument(
+            '--password', default='password',
+            help='Общий пароль всех созданных пользователей.',
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['news'] < 1:
+            raise CommandError('Нужны хотя бы один пользователь и новость.')
+        if options['days'] < 1:
+            raise CommandError('--days должен быть положительным.')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть положительным.')
+        rnd = random.Random(options['seed'])
+        loader = BulkLoader(self.stdout, options['batch_size'])
+        today = timezone.localdate()
+
+        with fast_sqlite():
+            # Хеш пароля вычисляется один раз: медленный алгоритм
+            # хеширования не замедляет загрузку.
+            password = make_password(options['password'])
+            first = next_number(User)
+            loader.load(User, (
+                User(username=f'seed{first + index}', password=password)
+                for index in range(options['users'])
+            ))
+            user_ids = self.last_ids(User, options['users'])
+
+            loader.load(News, (
+                News(
+                    title=f'Новость {index}',
+                    text=f'Текст синтетической новости номер {index}.',
+                    date=today - timedelta(
+                        days=rnd.randrange(options['days'])
+                    ),
+                )
+                for index in range(options['news'])
+            ))
+            news_ids = self.last_ids(News, options['news'])
+            # Самые обсуждаемые новости не совпадают с самыми новыми.
+            rnd.shuffle(news_ids)
+
+            loader.insert(
+                Comment,
+                (
+                    'news', 'author', 'text', 'created', 'updated',
+                    'flagged', 'path',
+                ),
+                self.comments(rnd, news_ids, user_ids, options),
+            )
+            # Пути строятся по ключам, которых при вставке ещё нет.
+            Comment.objects.fill_paths()
+            News.objects.recount_comments()
+            # bulk_create не отправляет сигналы, поэтому кеш главной
+            # страницы сбрасывается явно.
+            bump_versions(HOME_VERSION_KEY)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано строк: {loader.rows}, {loader.rate():.0f} строк/мин'
+        ))
+
+    @staticmethod
+    def last_ids(model, count):
+        """Ключи только что созданных строк: bulk_create их не заполняет."""
+        return sorted(
+            model.objects.order_by('-pk').values_list('pk', flat=True)[:count]
+        )
+
+    @staticmethod
+    def comments(rnd, news_ids, user_ids, options):
+        """Строки комментариев: новость выбирается по весам Ципфа."""
+        adapt = connection.ops.adapt_datetimefield_value
+        now = naive_now()
+        seconds = timedelta(days=options['days']).total_seconds()
+        cum_weights = zipf_weights(len(news_ids), options['skew'])
+        count, batch_size = options['comments'], options['batch_size']
+        for start in range(0, count, batch_size):
+            size = min(batch_size, count - start)
+            targets = rnd.choices(news_ids, cum_weights=cum_weights, k=size)
+            authors = rnd.choices(user_ids, k=size)
+            for index, (news_id, author_id) in enumerate(
+                zip(targets, authors), start
+            ):
+                created = adapt(
+                    now - timedelta(seconds=rnd.random() * seconds)
+                )
+                yield (
+                    news_id, author_id, f'Комментарий {index}',
+                    created, created, False, '',
+                )
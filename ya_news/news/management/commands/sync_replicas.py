@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from news.cache import REPLICA_VERSION_KEY, bump_version
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite в файлы реплик из '
+        'DATABASE_REPLICAS через backup API. Копирование идёт по '
+        'страницам и не блокирует запись в основную базу надолго.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pages', type=int, default=1024,
+            help='Сколько страниц копировать за один шаг.',
+        )
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        for alias in settings.DATABASE_REPLICAS:
+            replica = connections[alias]
+            if primary.vendor != 'sqlite' or replica.vendor != 'sqlite':
+                raise CommandError(
+                    f'Реплика {alias} не на SQLite: её синхронизирует '
+                    f'репликация СУБД.'
+                )
+            primary.ensure_connection()
+            replica.ensure_connection()
+            primary.connection.backup(
+                replica.connection, pages=options['pages']
+            )
+            self.stdout.write(f'{alias}: синхронизирована.')
+        # Страницы, построенные по устаревшим данным реплик, больше
+        # не читаются из кеша.
+        bump_version(REPLICA_VERSION_KEY)
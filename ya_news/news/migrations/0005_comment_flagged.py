@@ -0,0 +1,18 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0004_updated_timestamps'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='flagged',
+            field=models.BooleanField(default=False, help_text='Комментарий нарушает правила и ждёт модерации'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.2.15 on 2026-10-18 19:03
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+
+def fill_excerpt(apps, schema_editor):
+    News = apps.get_model('news', 'News')
+    queryset = News.objects.order_by('pk').only('pk', 'text')
+    last_pk = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk)[:1000])
+        if not batch:
+            break
+        for news in batch:
+            news.excerpt = Truncator(news.text).words(15, truncate=' …')
+        News.objects.bulk_update(batch, ['excerpt'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0006_comment_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='news',
+            name='excerpt',
+            field=models.TextField(blank=True, editable=False, help_text='Начало текста для списка новостей, заполняется при сохранении'),
+        ),
+        migrations.RunPython(fill_excerpt, migrations.RunPython.noop),
+    ]
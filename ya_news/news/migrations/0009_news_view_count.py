@@ -0,0 +1,22 @@
+# Generated by Django 3.2.15 on 2026-10-18 19:27
+
+from django.db import migrations, models
+
+from news.fts import create_search_triggers
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0008_news_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, create_search_triggers),
+        migrations.AddField(
+            model_name='news',
+            name='view_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, help_text='Просмотры страницы новости, записываются пачками'),
+        ),
+        migrations.RunPython(create_search_triggers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.2.15 on 2026-10-18 19:58
+
+from django.db import migrations, models
+
+from news.fts import create_search_triggers
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0009_news_view_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, create_search_triggers),
+        migrations.AddField(
+            model_name='news',
+            name='trending_score',
+            field=models.FloatField(db_index=True, default=0, editable=False, help_text='Число недавних комментариев с затуханием по времени'),
+        ),
+        migrations.RunPython(create_search_triggers, migrations.RunPython.noop),
+    ]
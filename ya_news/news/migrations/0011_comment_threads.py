@@ -0,0 +1,49 @@
+# Generated by Django 3.2.15 on 2026-10-18 20:21
+
+from django.db import migrations, models
+from django.db.models import Value
+from django.db.models.functions import Cast, LPad
+import django.db.models.deletion
+
+
+def fill_paths(apps, schema_editor):
+    """Существующие комментарии становятся корнями веток: путь из
+    одного ключа сохраняет их порядок добавления.
+    """
+    Comment = apps.get_model('news', 'Comment')
+    Comment.objects.using(schema_editor.connection.alias).update(
+        path=LPad(Cast('pk', models.CharField()), 10, Value('0'))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0010_news_trending_score'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='comment',
+            name='comment_news_created_idx',
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='parent',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='news.comment'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(default='', editable=False, help_text='Ключи предков и самого комментария, задаёт порядок вывода веток', max_length=200),
+        ),
+        migrations.RunPython(fill_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['news', 'path'], name='comment_news_path_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['parent'], name='comment_parent_idx'),
+        ),
+    ]
@@ -1,37 +1,307 @@
 from datetime import datetime
 
 from django.conf import settings
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models import Case, Count, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import (
+    Cast, Coalesce, Concat, Greatest, LPad, Now,
+)
+from django.utils import timezone
+from django.utils.text import Truncator
+
+
+class NewsQuerySet(models.QuerySet):
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """Заполняет выдержки: bulk_create не вызывает save()."""
+        objs = list(objs)
+        for news in objs:
+            news.excerpt = news.make_excerpt()
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def refresh_excerpts(self, batch_size=1000):
+        """Пересчитывает выдержки пачками в порядке первичного ключа.
+
+        Нужен после изменения текста через update(), который не
+        вызывает save().
+        """
+        queryset = self.order_by('pk').only('pk', 'text')
+        updated = last_pk = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                return updated
+            for news in batch:
+                news.excerpt = news.make_excerpt()
+            with transaction.atomic():
+                self.model.objects.bulk_update(batch, ['excerpt'])
+            updated += len(batch)
+            last_pk = batch[-1].pk
+
+    def recount_comments(self):
+        """Пересчитывает денормализованный счётчик комментариев.
+
+        Помеченные модерацией комментарии на сайте не выводятся и в
+        счётчик не входят.
+        """
+        counts = Comment.objects.filter(
+            news=OuterRef('pk'), flagged=False
+        ).order_by().values('news').annotate(
+            total=Count('pk')
+        ).values('total')
+        return self.update(comment_count=Coalesce(Subquery(counts), 0))
+
+    def change_comment_count(self, delta):
+        """Атомарно изменяет счётчик комментариев на delta.
+
+        Заодно обновляется время изменения новости: по нему строятся
+        валидаторы условных запросов. Счётчик не опускается ниже нуля,
+        даже если он разошёлся с таблицей комментариев. Новые
+        комментарии тем же UPDATE повышают рейтинг обсуждаемости,
+        удаление его не снижает: рейтинг убывает только со временем.
+        """
+        fields = {
+            'comment_count': Greatest(F('comment_count') + delta, 0),
+            'updated': Now(),
+        }
+        if delta > 0:
+            fields['trending_score'] = F('trending_score') + delta
+        return self.update(**fields)
+
+    def touch(self):
+        """Обновляет время изменения новостей, например после правки
+        комментария: по нему строятся валидаторы условных запросов.
+
+        Время берётся с микросекундами, а не из CURRENT_TIMESTAMP
+        SQLite, чтобы две правки за секунду дали разные ETag.
+        """
+        return self.update(updated=timezone.now())
+
+    def add_views(self, counts):
+        """Прибавляет просмотры из словаря {pk: число} одним UPDATE."""
+        increment = Case(
+            *(When(pk=pk, then=Value(count)) for pk, count in counts.items()),
+            default=Value(0),
+        )
+        return self.filter(pk__in=counts).update(
+            view_count=F('view_count') + increment
+        )
+
+    def most_read(self, limit):
+        """Самые читаемые новости, по индексу на view_count."""
+        return self.filter(view_count__gt=0).order_by('-view_count', '-pk')[
+            :limit
+        ]
+
+    def decay_trending(self, factor, min_score):
+        """Умножает рейтинг обсуждаемости на factor одним UPDATE.
+
+        Рейтинг ниже min_score обнуляется, поэтому по индексу
+        обходятся только новости с недавними комментариями.
+        """
+        return self.filter(trending_score__gt=0).update(
+            trending_score=Case(
+                When(trending_score__lt=min_score / factor, then=Value(0.0)),
+                default=F('trending_score') * factor,
+            )
+        )
+
+    def trending(self, limit):
+        """Самые обсуждаемые новости, по индексу на trending_score."""
+        return self.filter(trending_score__gt=0).order_by(
+            '-trending_score', '-pk'
+        )[:limit]
 
 
 class News(models.Model):
+    EXCERPT_WORDS = 15
+
     title = models.CharField(max_length=50)
     text = models.TextField()
+    excerpt = models.TextField(
+        blank=True,
+        editable=False,
+        help_text='Начало текста для списка новостей, заполняется при '
+                  'сохранении',
+    )
     date = models.DateField(default=datetime.today)
+    comment_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        db_index=True,
+    )
+    view_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        db_index=True,
+        help_text='Просмотры страницы новости, записываются пачками',
+    )
+    trending_score = models.FloatField(
+        default=0,
+        editable=False,
+        db_index=True,
+        help_text='Число недавних комментариев с затуханием по времени',
+    )
+    updated = models.DateTimeField(auto_now=True)
+
+    objects = NewsQuerySet.as_manager()
 
     class Meta:
-        ordering = ('-date',)
+        ordering = ('-date', '-id')
+        indexes = (
+            models.Index(fields=('date', 'id'), name='news_date_id_idx'),
+        )
         verbose_name_plural = 'Новости'
         verbose_name = 'Новость'
 
     def __str__(self):
         return self.title
 
+    def make_excerpt(self):
+        """Первые слова текста, как фильтр truncatewords."""
+        return Truncator(self.text).words(self.EXCERPT_WORDS, truncate=' …')
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        text_loaded = 'text' not in self.get_deferred_fields()
+        if text_loaded and (update_fields is None or 'text' in update_fields):
+            self.excerpt = self.make_excerpt()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'excerpt'}
+        super().save(*args, **kwargs)
+
+
+class CommentQuerySet(models.QuerySet):
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """Заполняет пути: bulk_create не вызывает save().
+
+        Пути пишутся в БД, но не в переданные объекты. Родители
+        ответов должны быть сохранены раньше.
+        """
+        objs = super().bulk_create(objs, *args, **kwargs)
+        self.model.objects.filter(
+            news_id__in={comment.news_id for comment in objs}
+        ).fill_paths()
+        return objs
+
+    def fill_paths(self):
+        """Строит пустые пути одним UPDATE: путь родителя и ключ
+        комментария. Нужен после вставки в обход save().
+        """
+        parent_path = self.model.objects.filter(
+            pk=OuterRef('parent_id')
+        ).values('path')
+        return self.filter(path='').update(path=Concat(
+            Coalesce(Subquery(parent_path), Value('')),
+            LPad(
+                Cast('pk', models.CharField()),
+                Comment.PATH_DIGITS,
+                Value('0'),
+            ),
+            output_field=models.CharField(),
+        ))
+
+    def thread(self, news_id):
+        """Комментарии новости в порядке вывода веток."""
+        return self.filter(news_id=news_id).order_by('path')
+
+    def subtree(self, comment):
+        """Комментарий с ответами на всех уровнях в порядке вывода:
+        один диапазон индекса по пути.
+        """
+        return self.thread(comment.news_id).filter(
+            path__gte=comment.path,
+            path__lt=comment.path + Comment.PATH_END,
+        )
+
 
 class Comment(models.Model):
+    # Путь — ключи предков и самого комментария, дополненные нулями
+    # до PATH_DIGITS цифр. Сортировка по пути выводит ответы сразу
+    # после родителя в порядке добавления, а ветка занимает непрерывный
+    # диапазон путей от пути комментария до пути с PATH_END на конце.
+    PATH_DIGITS = 10
+    PATH_END = ':'  # Следует за цифрами в ASCII.
+    MAX_DEPTH = 20
+
     news = models.ForeignKey(
         News,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False,
     )
     author = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
+        db_index=False,
+    )
+    parent = models.ForeignKey(
+        'self',
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name='replies',
+        editable=False,
+        db_index=False,
+    )
+    path = models.CharField(
+        max_length=PATH_DIGITS * MAX_DEPTH,
+        default='',
+        editable=False,
+        help_text='Ключи предков и самого комментария, задаёт порядок '
+                  'вывода веток',
     )
     text = models.TextField()
     created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+    flagged = models.BooleanField(
+        default=False,
+        help_text='Комментарий нарушает правила и ждёт модерации',
+    )
+
+    objects = CommentQuerySet.as_manager()
 
     class Meta:
         ordering = ('created',)
+        # Индексы покрывают и внешние ключи, поэтому у самих ключей
+        # отдельных индексов нет.
+        indexes = (
+            models.Index(
+                fields=('news', 'path'), name='comment_news_path_idx'
+            ),
+            models.Index(
+                fields=('author', 'id'), name='comment_author_id_idx'
+            ),
+            models.Index(fields=('parent',), name='comment_parent_idx'),
+            # Инкрементальная выгрузка: since и порядок по времени.
+            models.Index(
+                fields=('created', 'id'), name='comment_created_id_idx'
+            ),
+        )
 
     def __str__(self):
         return self.text[:50]
+
+    @property
+    def depth(self):
+        """Уровень вложенности: 0 у комментария к самой новости."""
+        return max(len(self.path) // self.PATH_DIGITS - 1, 0)
+
+    def make_path(self):
+        parent_path = self.parent.path if self.parent_id else ''
+        return f'{parent_path}{self.pk:0{self.PATH_DIGITS}d}'
+
+    def save(self, *args, **kwargs):
+        """Путь строится из ключа, поэтому у нового комментария он
+        записывается вторым UPDATE в той же транзакции.
+        """
+        using = kwargs.get('using') or router.db_for_write(
+            type(self), instance=self
+        )
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+            if not self.path:
+                self.path = self.make_path()
+                type(self).objects.using(using).filter(
+                    pk=self.pk
+                ).update(path=self.path)
@@ -0,0 +1,83 @@
+"""Постраничный вывод по ключу (keyset) вместо OFFSET.
+
+Курсор хранит значения полей сортировки последней показанной записи,
+поэтому каждая следующая страница выбирается диапазонным запросом
+по индексу и стоит столько же, сколько первая.
+"""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404
+
+
+class InvalidCursor(Http404):
+    """Курсор повреждён или не соответствует полям сортировки."""
+
+
+def encode_cursor(obj, ordering):
+    """Строит непрозрачный курсор по значениям полей сортировки obj."""
+    values = [
+        str(getattr(obj, field.lstrip('-'))) for field in ordering
+    ]
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, model, ordering):
+    """Восстанавливает значения полей сортировки из курсора."""
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(cursor + padding))
+    except (binascii.Error, ValueError):
+        raise InvalidCursor('Некорректный курсор.')
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise InvalidCursor('Некорректный курсор.')
+    try:
+        return [
+            model._meta.get_field(field.lstrip('-')).to_python(value)
+            for field, value in zip(ordering, values)
+        ]
+    except ValidationError:
+        raise InvalidCursor('Некорректный курсор.')
+
+
+def after_cursor(ordering, values):
+    """Условие «строго после курсора» для заданной сортировки.
+
+    Первое поле дополнительно ограничено нестрогим неравенством,
+    чтобы база могла выбрать диапазон по составному индексу.
+    """
+    def lookup(field, strict):
+        name = field.lstrip('-')
+        if field.startswith('-'):
+            return f'{name}__lt' if strict else f'{name}__lte'
+        return f'{name}__gt' if strict else f'{name}__gte'
+
+    condition = Q()
+    equal = Q()
+    for field, value in zip(ordering, values):
+        condition |= equal & Q(**{lookup(field, strict=True): value})
+        equal &= Q(**{field.lstrip('-'): value})
+    leading = Q(**{lookup(ordering[0], strict=False): values[0]})
+    return leading & condition
+
+
+def keyset_page(queryset, ordering, per_page, cursor=None):
+    """Возвращает страницу объектов и курсор следующей страницы.
+
+    Выбирается на одну запись больше, чтобы узнать о наличии следующей
+    страницы без отдельного COUNT.
+    """
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = decode_cursor(cursor, queryset.model, ordering)
+        queryset = queryset.filter(after_cursor(ordering, values))
+    object_list = list(queryset[:per_page + 1])
+    next_cursor = None
+    if len(object_list) > per_page:
+        object_list = object_list[:per_page]
+        next_cursor = encode_cursor(object_list[-1], ordering)
+    return object_list, next_cursor
@@ -1,14 +1,89 @@
+from contextlib import contextmanager
 from datetime import date, timedelta
 
 import pytest
 from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import connection, connections
 from django.test.client import Client
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 
+from news import counters
+from news.cache import reset_cache_stats
 from news.models import Comment, News
 
 today = date.today()
+MANY_COMMENTS_COUNT = 10_000
+ARCHIVE_NEWS_COUNT = 20_000
+
+
+@pytest.fixture(autouse=True)
+def clear_page_cache():
+    """Каждый тест начинает с пустого кеша страниц и фрагментов."""
+    cache.clear()
+    caches['template_fragments'].clear()
+    reset_cache_stats()
+
+
+@pytest.fixture(autouse=True)
+def reset_view_counters(settings):
+    """Просмотры не записываются в БД посреди тестов, если тест сам
+    не задаёт интервал, и не переходят в следующий тест.
+    """
+    settings.NEWS_VIEWS_FLUSH_INTERVAL = 3600
+    counters.reset()
+    yield
+    counters.reset()
+
+
+@pytest.fixture
+def assert_no_full_scan():
+    """Проверяет планы всех SELECT-запросов, выполненных внутри блока:
+    ни один не должен читать таблицу целиком.
+
+    Обход по индексу допустим только вместе с LIMIT: так читаются
+    первые N строк в порядке индекса.
+    """
+    def is_full_scan(sql, detail):
+        if not detail.startswith('SCAN'):
+            return False
+        return 'USING' not in detail or ' LIMIT ' not in sql
+
+    @contextmanager
+    def check():
+        with CaptureQueriesContext(connection) as context:
+            yield
+        full_scans = []
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                cursor.execute(f'EXPLAIN QUERY PLAN {query["sql"]}')
+                full_scans.extend(
+                    (query['sql'], row[-1]) for row in cursor.fetchall()
+                    if is_full_scan(query['sql'], row[-1])
+                )
+        assert not full_scans, full_scans
+    return check
+
+
+@pytest.fixture
+def replica(settings, tmp_path):
+    """Реплика для чтения в отдельном файле SQLite.
+
+    Заполняется из основной базы командой sync_replicas.
+    """
+    connections.databases['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': str(tmp_path / 'replica.sqlite3'),
+    }
+    settings.DATABASE_REPLICAS = ['replica']
+    yield connections['replica']
+    connections['replica'].close()
+    del connections['replica']
+    del connections.databases['replica']
 
 
 @pytest.fixture
@@ -31,6 +106,16 @@ def author_client(author):
     return client
 
 
+@pytest.fixture
+def cached_auth_client(settings, author):
+    """Автор с сессией cached_db и пользователем из кеша."""
+    settings.SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    settings.AUTHENTICATION_BACKENDS = ['perf.auth.CachedModelBackend']
+    client = Client()
+    client.force_login(author)
+    return client
+
+
 @pytest.fixture
 def not_author_client(not_author):
     """Авторизованный читатель."""
@@ -72,6 +157,20 @@ def create_news():
     )
 
 
+@pytest.fixture
+def create_archive():
+    """Большой архив новостей с повторяющимися датами."""
+    News.objects.bulk_create(
+        (
+            News(title=f'Новость {index}',
+                 text='Просто текст.',
+                 date=today - timedelta(days=index % 1000))
+            for index in range(ARCHIVE_NEWS_COUNT)
+        ),
+        batch_size=1000,
+    )
+
+
 @pytest.fixture
 def create_comments(news, author):
     """Набор комментариев автора."""
@@ -84,18 +183,81 @@ def create_comments(news, author):
         comment.save()
 
 
+@pytest.fixture
+def create_many_comments(news, author):
+    """Популярная новость с большим числом комментариев и ответом на
+    первый из них, который выводится сразу после родителя.
+    """
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author, text=f'Текст {index}')
+        for index in range(MANY_COMMENTS_COUNT - 1)
+    )
+    Comment.objects.create(
+        news=news, author=author, text='Ответ',
+        parent=Comment.objects.order_by('pk').first(),
+    )
+    News.objects.filter(pk=news.pk).recount_comments()
+
+
 @pytest.fixture
 def homepage_url():
     url = reverse('news:home')
     return url
 
 
+@pytest.fixture
+def archive_url():
+    url = reverse('news:archive')
+    return url
+
+
+@pytest.fixture
+def broken_archive_url(archive_url):
+    return f'{archive_url}?cursor=не-курсор'
+
+
+@pytest.fixture
+def search_url():
+    url = reverse('news:search')
+    return url
+
+
+@pytest.fixture
+def trending_url():
+    url = reverse('news:trending')
+    return url
+
+
 @pytest.fixture
 def news_detail_url(news):
     url = reverse('news:detail', args=(news.pk,))
     return url
 
 
+@pytest.fixture
+def comments_more_url(news):
+    url = reverse('news:comments', args=(news.pk,))
+    return url
+
+
+@pytest.fixture
+def news_events_url(news):
+    url = reverse('news:events', args=(news.pk,))
+    return url
+
+
+@pytest.fixture
+def news_export_url():
+    url = reverse('news:export', args=('news',))
+    return url
+
+
+@pytest.fixture
+def comments_export_url():
+    url = reverse('news:export', args=('comments',))
+    return url
+
+
 @pytest.fixture
 def comment_delete_url(comment):
     url = reverse('news:delete', args=(comment.pk,))
@@ -1,8 +1,30 @@
+import csv
+import json
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+
 import pytest
 from django.conf import settings
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test.client import Client
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils.module_loading import import_string
+from pytest_lazyfixture import lazy_fixture as lf
 
+from news.cache import HOME_VERSION_KEY, cache_stats
+from news.counters import flush, most_read, record_view
 from news.forms import CommentForm
+from news.fts import TRIGGERS
+from news.models import Comment, News
+from news.pagination import after_cursor, decode_cursor, encode_cursor
+from news.pytest_tests.conftest import (
+    ARCHIVE_NEWS_COUNT, MANY_COMMENTS_COUNT
+)
+from perf import stats as perf_stats
+from perf.middleware import UNRESOLVED, PerformanceMiddleware
+from yanews import settings_production
 
 pytestmark = pytest.mark.django_db
 
@@ -14,6 +36,81 @@ def test_news_count(client, create_news, homepage_url):
     assert news_count == settings.NEWS_COUNT_ON_HOME_PAGE
 
 
+def test_homepage_single_query(
+        client, create_many_comments, homepage_url, django_assert_num_queries
+):
+    """Главная страница выполняет один запрос к БД
+    независимо от числа комментариев к новостям, когда рейтинг самых
+    читаемых новостей уже в кеше.
+    """
+    most_read()
+    with django_assert_num_queries(1):
+        response = client.get(homepage_url)
+    assert f'Комментариев: {MANY_COMMENTS_COUNT}' in response.content.decode()
+
+
+def test_recount_comments_command(news, create_many_comments):
+    """Команда recount_comments восстанавливает счётчик комментариев."""
+    News.objects.update(comment_count=0)
+    call_command('recount_comments', stdout=StringIO())
+    news.refresh_from_db()
+    assert news.comment_count == MANY_COMMENTS_COUNT
+
+
+def test_most_read_block(client, create_news, homepage_url):
+    """Главная страница выводит самые читаемые новости по убыванию
+    просмотров, а после записи новых просмотров — новый порядок.
+    """
+    first, second, third = News.objects.all()[:3]
+    for news, views in ((first, 1), (second, 3), (third, 2)):
+        for _ in range(views):
+            record_view(news.pk)
+    flush()
+    response = client.get(homepage_url)
+    assert response.context['most_read'] == [
+        (news.pk, news.title) for news in (second, third, first)
+    ]
+    for _ in range(5):
+        record_view(first.pk)
+    flush()
+    response = client.get(homepage_url)
+    assert response.context['most_read'][0] == (first.pk, first.title)
+
+
+def test_trending_order(
+        settings, client, create_news, trending_url, django_assert_num_queries
+):
+    """Обсуждаемые новости выводятся по убыванию рейтинга одним
+    запросом, новости без недавних комментариев не выводятся.
+    """
+    settings.NEWS_COUNT_IN_TRENDING = 2
+    first, second, third, _ = News.objects.all()[:4]
+    for news, comments in ((first, 1), (second, 3), (third, 2)):
+        News.objects.filter(pk=news.pk).change_comment_count(comments)
+    with django_assert_num_queries(1):
+        response = client.get(trending_url)
+    assert list(response.context['object_list']) == [second, third]
+
+
+def test_home_page_uses_excerpt(client, news, homepage_url):
+    """Главная страница выводит готовую выдержку и не читает полный
+    текст новостей.
+    """
+    news.text = ' '.join(f'слово{index}' for index in range(30))
+    news.save()
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(homepage_url)
+    assert news.excerpt == ' '.join(
+        f'слово{index}' for index in range(News.EXCERPT_WORDS)
+    ) + ' …'
+    assert news.excerpt in response.content.decode()
+    assert 'слово20' not in response.content.decode()
+    assert not any(
+        '"news_news"."text"' in query['sql']
+        for query in context.captured_queries
+    )
+
+
 def test_news_order(client, create_news, homepage_url):
     """Новости отсортированы от самой свежей к самой старой.
     Свежие новости в начале списка.
@@ -25,6 +122,41 @@ def test_news_order(client, create_news, homepage_url):
     assert all_dates == sorted_dates
 
 
+def test_archive_continues_homepage(
+        client, create_news, homepage_url, archive_url
+):
+    """Архив продолжает главную страницу без пропусков и повторов."""
+    response = client.get(homepage_url)
+    home_ids = [news.pk for news in response.context['object_list']]
+    cursor = response.context['archive_cursor']
+    response = client.get(archive_url, {'cursor': cursor})
+    archive_ids = [news.pk for news in response.context['object_list']]
+    all_ids = list(News.objects.values_list('pk', flat=True))
+    assert home_ids + archive_ids == all_ids
+    assert response.context['next_cursor'] is None
+
+
+def test_archive_deep_page(
+        client, create_archive, archive_url, django_assert_num_queries
+):
+    """Глубокая страница архива выбирается одним запросом
+    по составному индексу, без OFFSET и сортировки во временном дереве.
+    """
+    ordering = News._meta.ordering
+    per_page = settings.NEWS_COUNT_ON_ARCHIVE_PAGE
+    middle = News.objects.all()[ARCHIVE_NEWS_COUNT // 2]
+    cursor = encode_cursor(middle, ordering)
+    with django_assert_num_queries(1):
+        response = client.get(archive_url, {'cursor': cursor})
+    assert len(response.context['object_list']) == per_page
+    values = decode_cursor(cursor, News, ordering)
+    plan = News.objects.order_by(*ordering).filter(
+        after_cursor(ordering, values)
+    )[:per_page + 1].explain()
+    assert 'USING INDEX news_date_id_idx' in plan
+    assert 'TEMP B-TREE' not in plan
+
+
 def test_comments_order(client, news, create_comments):
     """Новости отсортированы от самой свежей к самой старой.
     Свежие новости в начале списка.
@@ -39,6 +171,143 @@ def test_comments_order(client, news, create_comments):
     assert all_timestamps == sorted_timestamps
 
 
+def test_comment_threads_order(author_client, author, news, news_detail_url):
+    """Ответы выводятся сразу после родителя со сдвигом по уровню,
+    ветка выбирается одним диапазоном индекса уже отсортированной.
+    """
+    def post(text, parent=None):
+        data = {'text': text}
+        if parent is not None:
+            data['parent'] = parent.pk
+        author_client.post(news_detail_url, data=data)
+        return Comment.objects.get(text=text)
+
+    first = post('Первый')
+    second = post('Второй')
+    reply = post('Ответ', first)
+    nested = post('Ответ на ответ', reply)
+    late_reply = post('Поздний ответ', first)
+    response = author_client.get(news_detail_url)
+    thread = [first, reply, nested, late_reply]
+    assert response.context['comments'] == thread + [second]
+    assert [comment.depth for comment in thread] == [0, 1, 2, 1]
+    subtree = Comment.objects.subtree(first)
+    assert list(subtree) == thread
+    plan = subtree.explain()
+    assert 'USING INDEX comment_news_path_idx' in plan
+    assert 'TEMP B-TREE' not in plan
+
+
+def test_detail_comments_page(
+        client, create_many_comments, news_detail_url,
+        django_assert_num_queries
+):
+    """Страница новости выводит ограниченную порцию комментариев,
+    загружая их вместе с авторами одним запросом.
+    """
+    with django_assert_num_queries(2):
+        response = client.get(news_detail_url)
+    comments = response.context['comments']
+    assert len(comments) == settings.COMMENTS_COUNT_ON_PAGE
+    assert response.context['next_cursor'] is not None
+
+
+def test_load_more_comments(
+        client, news, create_many_comments, news_detail_url,
+        comments_more_url, django_assert_num_queries
+):
+    """Фрагмент «показать ещё» продолжает список комментариев."""
+    response = client.get(news_detail_url)
+    first_page = [comment.pk for comment in response.context['comments']]
+    cursor = response.context['next_cursor']
+    with django_assert_num_queries(1):
+        response = client.get(comments_more_url, {'cursor': cursor})
+    second_page = [comment.pk for comment in response.context['comments']]
+    expected = list(
+        news.comment_set.order_by('path').values_list(
+            'pk', flat=True
+        )[:2 * settings.COMMENTS_COUNT_ON_PAGE]
+    )
+    assert first_page + second_page == expected
+    assert '<html>' not in response.content.decode()
+
+
+@pytest.mark.parametrize(
+    'url',
+    (lf('homepage_url'), lf('news_detail_url')),
+)
+def test_warm_cache_hit_without_queries(
+        client, news, url, django_assert_num_queries
+):
+    """Повторный запрос анонимного пользователя отдаётся из кеша
+    без обращений к БД.
+    """
+    first = client.get(url)
+    with django_assert_num_queries(0):
+        second = client.get(url)
+    assert second.content == first.content
+    assert cache_stats() == {'hits': 1, 'misses': 1}
+
+
+def test_new_comment_invalidates_cache(
+        client, news, author, homepage_url, news_detail_url
+):
+    """Новый комментарий сбрасывает кеш страниц новости и главной."""
+    client.get(homepage_url)
+    client.get(news_detail_url)
+    Comment.objects.create(news=news, author=author, text='Свежий текст')
+    News.objects.filter(pk=news.pk).recount_comments()
+    assert 'Свежий текст' in client.get(news_detail_url).content.decode()
+    assert 'Комментариев: 1' in client.get(homepage_url).content.decode()
+    assert cache_stats()['hits'] == 0
+
+
+def test_authorized_client_not_cached(author_client, news, news_detail_url):
+    """Страницы авторизованного пользователя не кешируются."""
+    author_client.get(news_detail_url)
+    author_client.get(news_detail_url)
+    assert cache_stats() == {'hits': 0, 'misses': 0}
+
+
+def test_export_news_ndjson(admin_client, create_news, news_export_url):
+    """Выгрузка новостей в NDJSON потоковая и содержит все новости."""
+    response = admin_client.get(news_export_url)
+    assert response.streaming
+    records = [
+        json.loads(line)
+        for line in b''.join(response.streaming_content).splitlines()
+    ]
+    assert [record['pk'] for record in records] == list(
+        News.objects.order_by('pk').values_list('pk', flat=True)
+    )
+    assert records[0]['model'] == 'news.news'
+    assert set(records[0]['fields']) == {'title', 'text', 'date'}
+
+
+def test_export_comments_csv_since(
+        admin_client, news, create_comments, comments_export_url,
+        assert_no_full_scan
+):
+    """Выгрузка комментариев в CSV с параметром since содержит только
+    комментарии, созданные позже указанного времени, и читает их по
+    индексу, а не всю таблицу.
+    """
+    comments = list(Comment.objects.order_by('created'))
+    since = comments[1].created.isoformat()
+    with assert_no_full_scan():
+        response = admin_client.get(
+            comments_export_url, {'format': 'csv', 'since': since}
+        )
+        content = b''.join(response.streaming_content)
+    rows = list(csv.reader(content.decode().splitlines()))
+    assert rows[0] == [
+        'pk', 'news', 'parent', 'author', 'text', 'created'
+    ]
+    assert {int(row[0]) for row in rows[1:]} == {
+        comment.pk for comment in comments[2:]
+    }
+
+
 def test_anonymous_client_has_no_form(client, news):
     """Анонимному пользователю недоступна форма для отправки комментария
     на странице отдельной новости.
@@ -56,3 +325,219 @@ def test_authorized_client_has_form(author_client, news):
     response = author_client.get(url)
     assert 'form' in response.context
     assert isinstance(response.context['form'], CommentForm)
+
+
+@pytest.mark.parametrize(
+    'url',
+    (
+        lf('homepage_url'),
+        lf('archive_url'),
+        lf('trending_url'),
+        lf('news_detail_url'),
+        lf('comments_more_url'),
+        lf('comment_edit_url'),
+        lf('comment_delete_url'),
+    ),
+)
+def test_views_use_indexes(
+        author_client, create_comments, comment, url, assert_no_full_scan
+):
+    """Запросы страниц не читают таблицы целиком."""
+    with assert_no_full_scan():
+        author_client.get(url)
+
+
+def test_comment_post_uses_indexes(
+        author_client, news_detail_url, assert_no_full_scan
+):
+    """Запросы при отправке комментария не читают таблицы целиком."""
+    with assert_no_full_scan():
+        author_client.post(news_detail_url, data={'text': 'Новый текст'})
+
+
+def test_perf_instrumentation(
+        settings, tmp_path, author, news, comment, news_detail_url
+):
+    """Замеры запроса попадают в заголовок Server-Timing и в агрегаты
+    команды perf_stats.
+    """
+    settings.PERF_INSTRUMENTATION = True
+    settings.PERF_STATS_DIR = tmp_path
+    settings.PERF_FLUSH_INTERVAL = 0
+    perf_stats.reset()
+    client = Client()
+    client.force_login(author)
+    response = client.get(news_detail_url)
+    server_timing = response['Server-Timing']
+    assert 'db;dur=' in server_timing
+    assert 'render;dur=' in server_timing
+    stdout = StringIO()
+    call_command('perf_stats', json=True, stdout=stdout)
+    summary = json.loads(stdout.getvalue())
+    assert summary['news:detail']['count'] == 1
+    assert summary['news:detail']['queries_p50'] == 4
+    assert summary['news:detail']['size_p50'] == len(response.content)
+
+
+def test_perf_unresolved_paths_share_key(settings, client):
+    """Замеры запросов к несуществующим адресам копятся под одним
+    ключом, а не по ключу на каждый адрес.
+    """
+    settings.PERF_INSTRUMENTATION = True
+    settings.PERF_FLUSH_INTERVAL = 3600
+    perf_stats.reset()
+    for index in range(3):
+        client.get(f'/нет-такого-адреса-{index}/')
+    assert list(perf_stats.snapshot()) == [UNRESOLVED]
+    perf_stats.reset()
+
+
+def test_perf_exit_flush_registered_once(settings, monkeypatch):
+    """Сброс замеров при выходе регистрируется один раз, сколько бы раз
+    ни пересоздавалась цепочка middleware.
+    """
+    settings.PERF_INSTRUMENTATION = True
+    registered = []
+    monkeypatch.setattr(perf_stats.atexit, 'register', registered.append)
+    monkeypatch.setattr(perf_stats, '_flush_at_exit', False)
+    for _ in range(3):
+        PerformanceMiddleware(lambda request: None)
+    assert registered == [perf_stats.flush]
+
+
+def test_perf_concurrent_flushes(settings, tmp_path):
+    """Одновременные сбросы замеров из нескольких потоков не мешают
+    друг другу.
+    """
+    settings.PERF_STATS_DIR = tmp_path
+    perf_stats.reset()
+    perf_stats.record('news:home', total=1.0)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for future in [executor.submit(perf_stats.flush) for _ in range(64)]:
+            future.result()
+    assert perf_stats.load(tmp_path)['news:home']['total'] == [1.0]
+    perf_stats.reset()
+
+
+def test_perf_instrumentation_disabled(client, news, news_detail_url):
+    """По умолчанию замеры выключены."""
+    response = client.get(news_detail_url)
+    assert not response.has_header('Server-Timing')
+
+
+def test_sqlite_pragmas(settings):
+    """Каждое новое соединение получает прагмы из SQLITE_PRAGMAS."""
+    settings.SQLITE_PRAGMAS = {'cache_size': -4096, 'busy_timeout': 1234}
+    connection = connections.create_connection('default')
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size')
+            assert cursor.fetchone()[0] == -4096
+            cursor.execute('PRAGMA busy_timeout')
+            assert cursor.fetchone()[0] == 1234
+    finally:
+        connection.close()
+
+
+def test_production_cache_is_shared(tmp_path):
+    """Кеш профиля settings_production общий для процессов: версия,
+    сброшенная командой, видна серверу.
+    """
+    config = {**settings_production.CACHES['default'], 'LOCATION': tmp_path}
+    server, command = (
+        import_string(config['BACKEND'])(config['LOCATION'], config)
+        for _ in range(2)
+    )
+    server.set(HOME_VERSION_KEY, 1, timeout=None)
+    command.incr(HOME_VERSION_KEY)
+    assert server.get(HOME_VERSION_KEY) == 2
+
+
+def test_comment_fragment_cache(author_client, comment, news_detail_url):
+    """Блок комментария берётся из кеша, пока комментарий не изменён."""
+    author_client.get(news_detail_url)
+    Comment.objects.filter(pk=comment.pk).update(text='Текст мимо кеша')
+    response = author_client.get(news_detail_url)
+    assert 'Текст мимо кеша' not in response.content.decode()
+    comment.text = 'Исправленный текст'
+    comment.save()
+    response = author_client.get(news_detail_url)
+    assert 'Исправленный текст' in response.content.decode()
+
+
+def test_search_ranks_and_highlights(client, search_url):
+    """Поиск находит новости по словам заголовка и текста, ставит выше
+    лучшие совпадения и подсвечивает найденное, экранируя HTML.
+    """
+    best = News.objects.create(
+        title='Погода в Москве', text='Погода <b>солнечная</b>, погода тёплая.'
+    )
+    other = News.objects.create(title='Новости', text='Завтра погода хуже.')
+    News.objects.create(title='Спорт', text='Футбол.')
+    response = client.get(search_url, {'q': 'погода'})
+    results = response.context['results']
+    assert [news['pk'] for news in results] == [best.pk, other.pk]
+    assert '<mark>Погода</mark>' in results[0]['title']
+    assert '&lt;b&gt;солнечная&lt;/b&gt;' in results[0]['snippet']
+    assert '<mark>погода</mark>' in response.content.decode()
+
+
+def test_search_follows_changes(client, news, search_url):
+    """Индекс поиска обновляется при изменении и удалении новостей,
+    в том числе через update().
+    """
+    News.objects.filter(pk=news.pk).update(text='Уникальное слово')
+    response = client.get(search_url, {'q': 'уникальн'})
+    assert [result['pk'] for result in response.context['results']] == [
+        news.pk
+    ]
+    news.delete()
+    response = client.get(search_url, {'q': 'уникальн'})
+    assert response.context['results'] == []
+
+
+def test_search_pagination(client, search_url):
+    """Результаты поиска выводятся по страницам."""
+    per_page = settings.NEWS_COUNT_ON_SEARCH_PAGE
+    News.objects.bulk_create(
+        News(title=f'Новость {index}', text='Общее слово')
+        for index in range(per_page + 1)
+    )
+    response = client.get(search_url, {'q': 'общее'})
+    assert len(response.context['results']) == per_page
+    assert response.context['next_page'] == 2
+    response = client.get(search_url, {'q': 'общее', 'page': 2})
+    assert len(response.context['results']) == 1
+    assert response.context['next_page'] is None
+
+
+def test_search_short_words_match_whole(client, search_url):
+    """Короткие слова запроса ищутся целиком, а не по префиксу."""
+    exact = News.objects.create(title='По плану', text='Текст.')
+    News.objects.create(title='Погода', text='Текст.')
+    response = client.get(search_url, {'q': 'по'})
+    assert [news['pk'] for news in response.context['results']] == [
+        exact.pk
+    ]
+    response = client.get(search_url, {'q': 'пог'})
+    assert len(response.context['results']) == 1
+
+
+def test_search_triggers_after_migrate():
+    """После всех миграций у news_news есть триггеры поискового индекса:
+    SQLite удаляет их, когда миграция пересоздаёт таблицу.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master "
+            "WHERE type = 'trigger' AND tbl_name = 'news_news'"
+        )
+        triggers = {name for name, in cursor.fetchall()}
+    assert triggers == set(TRIGGERS)
+
+
+@pytest.mark.parametrize('query', ('', '"', 'AND OR *', 'NEAR('))
+def test_search_ignores_syntax(client, news, search_url, query):
+    """Операторы FTS5 во вводе не приводят к ошибке."""
+    response = client.get(search_url, {'q': query})
+    assert response.status_code == 200
@@ -1,10 +1,31 @@
+import asyncio
+import json
+import threading
+import time
 from http import HTTPStatus
+from io import StringIO
+from urllib.parse import urlencode
 
 import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.asgi import get_asgi_application
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models.signals import pre_save
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 from pytest_django.asserts import assertRedirects, assertFormError
+from pytest_lazyfixture import lazy_fixture as lf
 
+from news import counters, forms
+from news.async_views import THREAD_NAME_PREFIX, run_in_pool
+from news.events import EventStreamRouter, broadcaster
 from news.forms import BAD_WORDS, WARNING
-from news.models import Comment
+from news.models import Comment, News
+from news.replicas import PRIMARY_COOKIE
+from perf.auth import user_cache_key
 
 pytestmark = pytest.mark.django_db
 
@@ -21,6 +42,28 @@ def test_user_can_create_comment(author_client, author, news, news_detail_url):
     assert new_comment.text == form_data['text']
     assert new_comment.author == form_data['author']
     assert new_comment.news == form_data['news']
+    news.refresh_from_db()
+    assert news.comment_count == 1
+
+
+def test_user_can_reply_to_comment(
+        author_client, not_author_client, news, comment, news_detail_url
+):
+    """Ответ можно оставить только на комментарий той же новости."""
+    response = not_author_client.post(
+        news_detail_url, data={'text': 'Ответ', 'parent': comment.pk}
+    )
+    assertRedirects(response, f'{news_detail_url}#comments')
+    reply = Comment.objects.get(text='Ответ')
+    assert reply.parent == comment
+    assert reply.path.startswith(comment.path)
+    other_news = News.objects.create(title='Другая', text='Текст')
+    url = reverse('news:detail', args=(other_news.pk,))
+    response = author_client.post(
+        url, data={'text': 'Чужой ответ', 'parent': comment.pk}
+    )
+    assertFormError(response, 'form', 'parent', errors=forms.NO_PARENT)
+    assert not Comment.objects.filter(text='Чужой ответ').exists()
 
 
 def test_user_cant_create_comment(client, news_detail_url, login_url):
@@ -51,10 +94,218 @@ def test_user_cant_use_bad_words(author_client, news_detail_url):
     )
 
 
+@pytest.mark.parametrize(
+    'text',
+    (
+        'Безобидный текст',
+        'РЕДИСКА в начале',
+        'в середине негодяйский текст',
+        'редис и негодя',
+    ),
+)
+def test_bad_words_matcher_same_as_substring_search(text):
+    """Автомат находит запрещённые слова так же, как поиск подстрок."""
+    lowered_text = text.lower()
+    expected = any(word in lowered_text for word in BAD_WORDS)
+    assert forms.bad_words_matcher.search(lowered_text) == expected
+
+
+def test_bad_words_from_file(settings, tmp_path, author_client,
+                             news_detail_url):
+    """Запрещённые слова дополняются из файла BAD_WORDS_FILE."""
+    words_file = tmp_path / 'bad_words.txt'
+    words_file.write_text('# комментарий\n\nбалбес\n', encoding='utf-8')
+    settings.BAD_WORDS_FILE = words_file
+    forms.reload_bad_words()
+    try:
+        comments_count = Comment.objects.count()
+        response = author_client.post(
+            news_detail_url, data={'text': 'Ну ты и Балбес'}
+        )
+        assert comments_count == Comment.objects.count()
+        assertFormError(response, form='form', field='text', errors=WARNING)
+    finally:
+        settings.BAD_WORDS_FILE = None
+        forms.reload_bad_words()
+
+
+@pytest.fixture
+def comments_to_remoderate(news, author):
+    """Комментарии, сохранённые до пополнения списка запрещённых слов."""
+    texts = ('Чистый текст', f'Ты {BAD_WORDS[0]}!', 'Ещё текст',
+             f'{BAD_WORDS[1].upper()}', 'Последний')
+    Comment.objects.bulk_create(
+        Comment(news=news, author=author, text=text) for text in texts
+    )
+    News.objects.filter(pk=news.pk).recount_comments()
+    return list(Comment.objects.order_by('pk'))
+
+
+@pytest.mark.parametrize('action', ('flag', 'delete'))
+def test_remoderate_comments(
+        client, news, comments_to_remoderate, news_detail_url, action
+):
+    """Команда remoderate_comments находит сохранённые комментарии
+    с запрещёнными словами и помечает или удаляет их; страница новости
+    из кеша сбрасывается, и нарушители на ней больше не выводятся.
+    """
+    client.get(news_detail_url)
+    call_command(
+        'remoderate_comments', action=action, chunk_size=2, workers=2,
+        stdout=StringIO(),
+    )
+    offenders = {comments_to_remoderate[1].pk, comments_to_remoderate[3].pk}
+    news.refresh_from_db()
+    if action == 'flag':
+        flagged = set(
+            Comment.objects.filter(flagged=True).values_list('pk', flat=True)
+        )
+        assert flagged == offenders
+        assert news.comment_count == len(comments_to_remoderate) - 2
+        call_command(
+            'remoderate_comments', action=action, chunk_size=2, workers=2,
+            stdout=StringIO(),
+        )
+        news.refresh_from_db()
+        assert news.comment_count == len(comments_to_remoderate) - 2
+    else:
+        assert not Comment.objects.filter(pk__in=offenders).exists()
+        assert Comment.objects.count() == len(comments_to_remoderate) - 2
+        assert news.comment_count == Comment.objects.count()
+    shown = client.get(news_detail_url).context['comments']
+    assert {comment.pk for comment in shown}.isdisjoint(offenders)
+    assert len(shown) == len(comments_to_remoderate) - 2
+
+
+def test_flagged_comments_in_admin(admin_client, comments_to_remoderate):
+    """Помеченные комментарии отбираются фильтром в админке."""
+    comment = comments_to_remoderate[1]
+    Comment.objects.filter(pk=comment.pk).update(flagged=True)
+    response = admin_client.get(
+        reverse('admin:news_comment_changelist'), {'flagged__exact': 1}
+    )
+    assert list(response.context['cl'].result_list) == [comment]
+
+
+def test_flagging_changes_etag(
+        admin_client, client, comments_to_remoderate, news_detail_url
+):
+    """После пометки комментария командой и снятия отметки в админке
+    повторный условный запрос получает страницу заново, а счётчик
+    комментариев учитывает только видимые.
+    """
+    etag = client.get(news_detail_url)['ETag']
+    call_command(
+        'remoderate_comments', chunk_size=2, workers=1, stdout=StringIO()
+    )
+    response = client.get(news_detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+    assert response['ETag'] != etag
+    etag = response['ETag']
+    comment = Comment.objects.filter(flagged=True).first()
+    admin_client.post(
+        reverse('admin:news_comment_change', args=(comment.pk,)),
+        {
+            'news': comment.news_id,
+            'author': comment.author_id,
+            'text': comment.text,
+        },
+    )
+    assert not Comment.objects.get(pk=comment.pk).flagged
+    assert News.objects.get(pk=comment.news_id).comment_count == (
+        len(comments_to_remoderate) - 1
+    )
+    response = client.get(news_detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+    assert comment in response.context['comments']
+
+
+def test_remoderate_comments_resumes_from_checkpoint(
+        tmp_path, comments_to_remoderate
+):
+    """Проверка продолжается после pk из контрольной точки."""
+    checkpoint = tmp_path / 'checkpoint'
+    checkpoint.write_text(str(comments_to_remoderate[2].pk))
+    call_command(
+        'remoderate_comments', chunk_size=2, workers=1,
+        checkpoint=checkpoint, stdout=StringIO(),
+    )
+    flagged = list(
+        Comment.objects.filter(flagged=True).values_list('pk', flat=True)
+    )
+    assert flagged == [comments_to_remoderate[3].pk]
+    assert checkpoint.read_text() == str(comments_to_remoderate[-1].pk)
+
+
+def test_import_news(tmp_path, author, news):
+    """Команда import_news загружает новости и комментарии пачками,
+    пропуская некорректные строки.
+    """
+    records = (
+        {'model': 'news.news', 'pk': 1000,
+         'fields': {'title': 'Из дампа', 'text': 'Текст',
+                    'date': '2022-10-01'}},
+        {'model': 'news.comment',
+         'fields': {'news': 1000, 'author': author.username,
+                    'text': 'Старый комментарий',
+                    'created': '2022-10-02T10:00:00+00:00'}},
+        {'model': 'news.comment',
+         'fields': {'news': news.pk, 'author': author.username,
+                    'text': 'К существующей новости'}},
+        {'model': 'news.comment',
+         'fields': {'news': 1000, 'author': 'Незнакомец', 'text': 'Текст'}},
+        {'model': 'news.news', 'fields': {'title': 'Т' * 51, 'text': ''}},
+        {'model': 'news.unknown', 'fields': {}},
+    )
+    dump = tmp_path / 'dump.jsonl'
+    dump.write_text(
+        '\n'.join(json.dumps(record) for record in records) + '\nне json\n',
+        encoding='utf-8',
+    )
+    stderr = StringIO()
+    call_command(
+        'import_news', dump, batch_size=2, stdout=StringIO(), stderr=stderr
+    )
+    imported = News.objects.get(pk=1000)
+    assert imported.comment_count == 1
+    old_comment = imported.comment_set.get()
+    assert old_comment.created.year == 2022
+    news.refresh_from_db()
+    assert news.comment_count == 1
+    assert len(stderr.getvalue().splitlines()) == 4
+
+
+def test_import_news_restores_threads(
+        admin_client, tmp_path, not_author, news, comment, comments_export_url
+):
+    """Выгрузка комментариев, загруженная командой import_news,
+    восстанавливает ветки: родителей, пути и порядок вывода.
+    """
+    reply = Comment.objects.create(
+        news=news, author=not_author, parent=comment, text='Ответ'
+    )
+    Comment.objects.create(
+        news=news, author=not_author, parent=reply, text='Ответ на ответ'
+    )
+    Comment.objects.create(news=news, author=not_author, text='Другой')
+    expected = list(
+        Comment.objects.thread(news.pk).values_list('pk', 'parent', 'path')
+    )
+    response = admin_client.get(comments_export_url)
+    dump = tmp_path / 'comments.jsonl'
+    dump.write_bytes(b''.join(response.streaming_content))
+    Comment.objects.all().delete()
+    call_command('import_news', dump, batch_size=2, stdout=StringIO())
+    assert list(
+        Comment.objects.thread(news.pk).values_list('pk', 'parent', 'path')
+    ) == expected
+
+
 def test_author_can_delete_comment(
-        author_client, news_detail_url, comment_delete_url
+        author_client, news, news_detail_url, comment_delete_url
 ):
     """Авторизованный пользователь может удалять свои комментарии."""
+    News.objects.filter(pk=news.pk).recount_comments()
     count_comments = Comment.objects.count()
     url = comment_delete_url
     expected_redirect_url = news_detail_url
@@ -62,6 +313,29 @@ def test_author_can_delete_comment(
     assertRedirects(response, f'{expected_redirect_url}#comments')
     count_comments_after_delete = Comment.objects.count()
     assert count_comments_after_delete == count_comments - 1
+    news.refresh_from_db()
+    assert news.comment_count == count_comments_after_delete
+
+
+def test_delete_comment_with_replies(
+        author_client, not_author, news, comment, comment_delete_url
+):
+    """Удаление комментария удаляет и ответы на него, а счётчик
+    новости уменьшается на удалённые комментарии, кроме помеченных.
+    """
+    reply = Comment.objects.create(
+        news=news, author=not_author, parent=comment, text='Ответ'
+    )
+    Comment.objects.create(
+        news=news, author=not_author, parent=reply, text='Ответ на ответ',
+        flagged=True,
+    )
+    Comment.objects.create(news=news, author=not_author, text='Другой')
+    News.objects.filter(pk=news.pk).recount_comments()
+    author_client.delete(comment_delete_url)
+    assert list(Comment.objects.values_list('text', flat=True)) == ['Другой']
+    news.refresh_from_db()
+    assert news.comment_count == 1
 
 
 def test_not_author_cant_delete_comment(
@@ -89,6 +363,7 @@ def test_author_can_edit_comment(
     assert comment.text == form_data['text']
     assert comment.author == initial_comment.author
     assert comment.news == initial_comment.news
+    assert comment.path == initial_comment.path
 
 
 def test_not_author_cant_edit_comment(
@@ -104,3 +379,407 @@ def test_not_author_cant_edit_comment(
     assert comment.text == initial_comment.text
     assert comment.author == initial_comment.author
     assert comment.news == initial_comment.news
+    assert comment.path == initial_comment.path
+
+
+@pytest.mark.parametrize(
+    'method, url, data, budget',
+    (
+        # Сессия, пользователь, новость, комментарии.
+        ('get', lf('news_detail_url'), None, 4),
+        # Сессия, пользователь, новость; вставка, путь комментария
+        # и счётчик в транзакции.
+        ('post', lf('news_detail_url'), {'text': 'Новый текст'}, 8),
+        # Сессия, пользователь, комментарий вместе с новостью.
+        ('get', lf('comment_edit_url'), None, 3),
+        ('get', lf('comment_delete_url'), None, 3),
+        # Плюс запись изменений: при правке — и времени изменения
+        # новости в транзакции, при удалении — подсчёт видимых
+        # комментариев ветки и поиск ответов.
+        ('post', lf('comment_edit_url'), {'text': 'Новый текст'}, 7),
+        ('post', lf('comment_delete_url'), None, 9),
+    ),
+)
+def test_query_budget(
+        author_client, comment, method, url, data, budget,
+        django_assert_max_num_queries
+):
+    """Каждый объект загружается за запрос не больше одного раза."""
+    with django_assert_max_num_queries(budget):
+        getattr(author_client, method)(url, data)
+
+
+def test_seed_is_deterministic():
+    """Команда seed создаёт заданный объём данных, одинаковый при
+    одинаковом зерне, а счётчики комментариев и пути сходятся.
+    """
+    def seed():
+        News.objects.all().delete()
+        call_command(
+            'seed', users=5, news=20, comments=500, skew=1.5, seed=7,
+            batch_size=64, stdout=StringIO(),
+        )
+        return list(
+            News.objects.order_by('pk').values_list('title', 'comment_count')
+        )
+
+    first, second = seed(), seed()
+    assert first == second
+    assert len(first) == 20
+    assert sum(count for _, count in first) == 500
+    counts = sorted((count for _, count in first), reverse=True)
+    assert counts[0] > counts[-1]
+    news = News.objects.order_by('-comment_count').first()
+    assert news.comment_set.count() == news.comment_count
+    assert not Comment.objects.filter(path='').exists()
+
+
+def test_seed_after_deletions(django_user_model):
+    """Повторный запуск seed после удаления пользователя не повторяет
+    уже занятые имена.
+    """
+    call_command('seed', users=3, news=2, comments=10, stdout=StringIO())
+    seeded = django_user_model.objects.filter(username__startswith='seed')
+    seeded.first().delete()
+    call_command('seed', users=3, news=2, comments=10, stdout=StringIO())
+    assert seeded.count() == 5
+
+
+def sync_replicas():
+    """Реплика получает только зафиксированные данные, поэтому тесты
+    с ней работают без общей транзакции.
+    """
+    call_command('sync_replicas', stdout=StringIO())
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reads_use_replica(replica, client, admin_client, news):
+    """Страница новости и список новостей в админке читаются с реплики,
+    пока она не синхронизирована с основной базой.
+    """
+    initial_title = news.title
+    sync_replicas()
+    news.title = 'Новый заголовок'
+    news.save()
+    detail_url = reverse('news:detail', args=(news.pk,))
+    pages = (
+        (client, detail_url),
+        (admin_client, reverse('admin:news_news_changelist')),
+    )
+    for user_client, url in pages:
+        content = user_client.get(url).content.decode()
+        assert initial_title in content
+        assert 'Новый заголовок' not in content
+    sync_replicas()
+    assert 'Новый заголовок' in client.get(detail_url).content.decode()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_reads_after_write_use_primary(
+        replica, author_client, news, news_detail_url
+):
+    """После записи и сам запрос, и следующие запросы клиента читают
+    с основной базы.
+    """
+    sync_replicas()
+    response = author_client.post(news_detail_url, {'text': 'Новый текст'})
+    assert PRIMARY_COOKIE in response.cookies
+    response = author_client.get(news_detail_url)
+    assert 'Новый текст' in response.content.decode()
+    author_client.cookies.pop(PRIMARY_COOKIE)
+    response = author_client.get(news_detail_url)
+    assert 'Новый текст' not in response.content.decode()
+
+
+def test_backfill_excerpts(news):
+    """Команда backfill_excerpts обновляет выдержки после update()."""
+    News.objects.update(text='Новый текст новости')
+    call_command('backfill_excerpts', batch_size=1, stdout=StringIO())
+    news.refresh_from_db()
+    assert news.excerpt == 'Новый текст новости'
+
+
+def test_cached_auth_runs_no_auth_queries(
+        cached_auth_client, author, comment, news_detail_url
+):
+    """Сессия и пользователь авторизованного запроса берутся из кеша."""
+    cached_auth_client.get(news_detail_url)
+    with CaptureQueriesContext(connection) as context:
+        response = cached_auth_client.get(news_detail_url)
+    assert response.context['user'] == author
+    assert not any(
+        'FROM "django_session"' in query['sql']
+        or 'FROM "auth_user"' in query['sql']
+        for query in context.captured_queries
+    )
+
+
+def test_cached_user_invalidation(
+        cached_auth_client, author, news_detail_url, logout_url
+):
+    """Смена пароля и выход удаляют пользователя из кеша."""
+    cached_auth_client.get(news_detail_url)
+    author.set_password('Новый пароль')
+    author.save()
+    response = cached_auth_client.get(news_detail_url)
+    assert not response.context['user'].is_authenticated
+    cached_auth_client.force_login(author)
+    cached_auth_client.get(news_detail_url)
+    assert cache.get(user_cache_key(author.pk)) is not None
+    cached_auth_client.post(logout_url)
+    assert cache.get(user_cache_key(author.pk)) is None
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_views_run_in_pool(settings, author, news):
+    """Под ASGI главная страница, страница новости и отправка
+    комментария выполняются в пуле потоков.
+    """
+    settings.ASYNC_VIEW_THREADS = 2
+    threads = []
+
+    def remember_thread(**kwargs):
+        threads.append(threading.current_thread().name)
+
+    client = AsyncClient()
+    client.force_login(author)
+    detail_url = reverse('news:detail', args=(news.pk,))
+
+    async def get(url):
+        return await client.get(url)
+
+    async def post(url, data):
+        # AsyncClient в Django 3.2 не дочитывает тело multipart-запроса.
+        return await client.post(
+            url, urlencode(data),
+            content_type='application/x-www-form-urlencoded',
+        )
+
+    pre_save.connect(remember_thread, sender=Comment)
+    try:
+        response = async_to_sync(get)(reverse('news:home'))
+        assert response.status_code == HTTPStatus.OK
+        assert news.title in response.content.decode()
+        response = async_to_sync(post)(detail_url, {'text': 'Новый текст'})
+        assert response['Location'] == f'{detail_url}#comments'
+        response = async_to_sync(get)(detail_url)
+        assert 'Новый текст' in response.content.decode()
+    finally:
+        pre_save.disconnect(remember_thread, sender=Comment)
+    assert len(threads) == 1
+    assert threads[0].startswith(THREAD_NAME_PREFIX)
+
+
+def test_async_view_pool_is_bounded(settings):
+    """Одновременно выполняется не больше ASYNC_VIEW_THREADS заданий."""
+    settings.ASYNC_VIEW_THREADS = 3
+    lock = threading.Lock()
+    active = peak = 0
+
+    def job():
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.02)
+        with lock:
+            active -= 1
+        return threading.current_thread().name
+
+    async def run_jobs():
+        return await asyncio.gather(*(run_in_pool(job) for _ in range(12)))
+
+    names = async_to_sync(run_jobs)()
+    assert peak == settings.ASYNC_VIEW_THREADS
+    assert all(name.startswith(THREAD_NAME_PREFIX) for name in names)
+
+
+def test_comment_events_wsgi(
+        client, author, news, news_events_url,
+        django_capture_on_commit_callbacks
+):
+    """Поток событий новости получает новый комментарий и отписывается
+    при закрытии ответа.
+    """
+    response = client.get(news_events_url)
+    assert response['Content-Type'].startswith('text/event-stream')
+    events = iter(response.streaming_content)
+    next(events)
+    with django_capture_on_commit_callbacks(execute=True):
+        comment = Comment.objects.create(
+            news=news, author=author, text='Новый текст'
+        )
+    message = next(events).decode()
+    assert f'id: {comment.pk}' in message
+    assert 'Новый текст' in message
+    response.close()
+    assert broadcaster.subscriber_count(news.pk) == 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_comment_events_fan_out(author, news, news_events_url):
+    """Сотни подписчиков под ASGI получают комментарий, отрисованный
+    один раз, без запросов к БД на каждого подписчика.
+    """
+    subscribers = 300
+    # Как в yanews.asgi, но без регистрации сброса счётчиков при выходе.
+    application = EventStreamRouter(get_asgi_application())
+
+    def create_comment():
+        with CaptureQueriesContext(connection) as context:
+            comment = Comment.objects.create(
+                news=news, author=author, text='Новый текст'
+            )
+        return comment, [
+            query['sql'].split()[0] for query in context.captured_queries
+        ]
+
+    async def run():
+        disconnect = asyncio.Event()
+        received = [asyncio.Future() for _ in range(subscribers)]
+
+        async def subscribe(future):
+            requested = False
+
+            async def receive():
+                nonlocal requested
+                if not requested:
+                    requested = True
+                    return {'type': 'http.request'}
+                await disconnect.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                body = message.get('body', b'').decode()
+                if 'event: comment' in body and not future.done():
+                    future.set_result(body)
+
+            scope = {
+                'type': 'http', 'method': 'GET', 'path': news_events_url,
+            }
+            await application(scope, receive, send)
+
+        tasks = [
+            asyncio.ensure_future(subscribe(future)) for future in received
+        ]
+        while broadcaster.subscriber_count(news.pk) < subscribers:
+            await asyncio.sleep(0.01)
+        comment, queries = await sync_to_async(create_comment)()
+        messages = await asyncio.wait_for(asyncio.gather(*received), 5)
+        disconnect.set()
+        await asyncio.gather(*tasks)
+        return comment, queries, messages
+
+    comment, queries, messages = async_to_sync(run)()
+    # Вставка и путь комментария в одной транзакции.
+    assert queries == ['BEGIN', 'INSERT', 'UPDATE']
+    assert all(
+        f'id: {comment.pk}' in message and 'Новый текст' in message
+        for message in messages
+    )
+    assert broadcaster.subscriber_count(news.pk) == 0
+
+
+def test_views_buffered_until_flush(client, news, news_detail_url):
+    """Просмотры копятся в памяти и записываются одним UPDATE."""
+    for _ in range(100):
+        client.get(news_detail_url)
+    news.refresh_from_db()
+    assert news.view_count == 0
+    assert counters.pending() == {news.pk: 100}
+    with CaptureQueriesContext(connection) as context:
+        counters.flush()
+    updates = [
+        query for query in context.captured_queries
+        if query['sql'].startswith('UPDATE')
+    ]
+    assert len(updates) == 1
+    news.refresh_from_db()
+    assert news.view_count == 100
+
+
+@pytest.mark.django_db(transaction=True)
+def test_views_flush_once_per_interval(settings, create_news):
+    """Сколько бы просмотров ни пришло из разных потоков, за интервал
+    выполняется не больше одной транзакции записи.
+    """
+    settings.NEWS_VIEWS_FLUSH_INTERVAL = interval = 0.05
+    news_ids = list(News.objects.values_list('pk', flat=True))
+    duration, threads = 0.5, 8
+    lock = threading.Lock()
+    writes = []
+    views = 0
+
+    def remember_writes(execute, sql, params, many, context):
+        if sql.startswith('UPDATE'):
+            with lock:
+                writes.append(time.monotonic())
+        return execute(sql, params, many, context)
+
+    def worker(index):
+        nonlocal views
+        count = 0
+        with connection.execute_wrapper(remember_writes):
+            while time.monotonic() - started < duration:
+                counters.record_view(news_ids[(index + count) % len(news_ids)])
+                count += 1
+        connection.close()
+        with lock:
+            views += count
+
+    workers = [
+        threading.Thread(target=worker, args=(index,))
+        for index in range(threads)
+    ]
+    counters.reset()
+    started = time.monotonic()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.monotonic() - started
+    counters.flush()
+    assert 0 < len(writes) <= elapsed / interval + 1
+    total = sum(News.objects.values_list('view_count', flat=True))
+    assert total == views
+
+
+def test_trending_score_follows_new_comments(
+        author_client, news, news_detail_url
+):
+    """Новый комментарий повышает рейтинг обсуждаемости новости,
+    удаление комментария его не снижает.
+    """
+    author_client.post(news_detail_url, data={'text': 'Новый текст'})
+    news.refresh_from_db()
+    assert news.trending_score == 1
+    comment = Comment.objects.get()
+    author_client.delete(reverse('news:delete', args=(comment.pk,)))
+    news.refresh_from_db()
+    assert news.comment_count == 0
+    assert news.trending_score == 1
+
+
+def test_decay_trending(settings, create_news):
+    """Команда decay_trending за период полураспада уменьшает рейтинг
+    вдвое и обнуляет рейтинг ниже NEWS_TRENDING_MIN_SCORE.
+    """
+    settings.NEWS_TRENDING_MIN_SCORE = 0.5
+    active, quiet, _ = News.objects.all()[:3]
+    News.objects.filter(pk=active.pk).change_comment_count(4)
+    News.objects.filter(pk=quiet.pk).change_comment_count(1)
+    stdout = StringIO()
+    call_command(
+        'decay_trending', interval=settings.NEWS_TRENDING_HALF_LIFE,
+        stdout=stdout,
+    )
+    assert stdout.getvalue().strip().endswith(': 2')
+    active.refresh_from_db()
+    quiet.refresh_from_db()
+    assert active.trending_score == pytest.approx(2)
+    assert quiet.trending_score == pytest.approx(0.5)
+    call_command(
+        'decay_trending', interval=settings.NEWS_TRENDING_HALF_LIFE,
+        stdout=stdout,
+    )
+    assert list(News.objects.trending(10)) == [active]
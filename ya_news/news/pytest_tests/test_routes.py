@@ -1,6 +1,8 @@
 from http import HTTPStatus
 
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from pytest_django.asserts import assertRedirects
 from pytest_lazyfixture import lazy_fixture as lf
 
@@ -9,7 +11,11 @@ pytestmark = pytest.mark.django_db
 
 @pytest.mark.parametrize(
     'name',
-    (lf('comment_edit_url'), lf('comment_delete_url')),
+    (
+        lf('comment_edit_url'),
+        lf('comment_delete_url'),
+        lf('comments_export_url'),
+    ),
 )
 def test_comment_delete_edit_availability_for_anonymous_user(
         client, name, login_url
@@ -36,6 +42,31 @@ def test_comment_delete_edit_availability_for_anonymous_user(
             lf('client'),
             HTTPStatus.OK
         ),
+        (
+            lf('archive_url'),
+            lf('client'),
+            HTTPStatus.OK
+        ),
+        (
+            lf('search_url'),
+            lf('client'),
+            HTTPStatus.OK
+        ),
+        (
+            lf('trending_url'),
+            lf('client'),
+            HTTPStatus.OK
+        ),
+        (
+            lf('news_events_url'),
+            lf('client'),
+            HTTPStatus.OK
+        ),
+        (
+            lf('broken_archive_url'),
+            lf('client'),
+            HTTPStatus.NOT_FOUND
+        ),
         (
             lf('signup_url'),
             lf('client'),
@@ -51,6 +82,16 @@ def test_comment_delete_edit_availability_for_anonymous_user(
             lf('client'),
             HTTPStatus.OK
         ),
+        (
+            lf('comments_export_url'),
+            lf('author_client'),
+            HTTPStatus.FORBIDDEN
+        ),
+        (
+            lf('comments_export_url'),
+            lf('admin_client'),
+            HTTPStatus.OK
+        ),
         (
             lf('comment_edit_url'),
             lf('not_author_client'),
@@ -78,3 +119,66 @@ def test_authorization_statuses_for_different_users(
 ):
     response = parametrized_client.get(reverse_url)
     assert response.status_code == status
+
+
+@pytest.mark.parametrize(
+    'url',
+    (lf('homepage_url'), lf('news_detail_url')),
+)
+def test_not_modified_by_etag(
+        client, news, url, django_assert_num_queries
+):
+    """Повторный запрос с If-None-Match получает 304 за один запрос к БД,
+    без построения страницы.
+    """
+    etag = client.get(url)['ETag']
+    with django_assert_num_queries(1):
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.content == b''
+
+
+@pytest.mark.parametrize(
+    'url',
+    (lf('homepage_url'), lf('news_detail_url')),
+)
+def test_not_modified_since(client, news, url):
+    """Запрос с If-Modified-Since получает 304, пока ничего не менялось."""
+    last_modified = client.get(url)['Last-Modified']
+    response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+def test_new_comment_changes_etag(
+        author_client, client, news, news_detail_url
+):
+    """После нового комментария страница новости отдаётся заново."""
+    etag = client.get(news_detail_url)['ETag']
+    author_client.post(news_detail_url, data={'text': 'Новый текст'})
+    response = client.get(news_detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
+    assert response['ETag'] != etag
+
+
+def test_detail_validators_skip_comments(
+        client, create_comments, news_detail_url
+):
+    """Валидаторы страницы новости берутся из строки новости, без
+    агрегирования её комментариев.
+    """
+    etag = client.get(news_detail_url)['ETag']
+    with CaptureQueriesContext(connection) as context:
+        client.get(news_detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert not any(
+        'news_comment' in query['sql'] for query in context.captured_queries
+    )
+
+
+def test_comment_edit_changes_etag(
+        author_client, client, comment, news_detail_url, comment_edit_url
+):
+    """Правка комментария меняет ETag страницы новости."""
+    etag = client.get(news_detail_url)['ETag']
+    author_client.post(comment_edit_url, data={'text': 'Новый текст'})
+    response = client.get(news_detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.OK
@@ -0,0 +1,93 @@
+"""Чтение новостей и комментариев с реплик только для чтения.
+
+Реплики — псевдонимы из DATABASES, перечисленные в DATABASE_REPLICAS.
+ReplicaMiddleware выбирает одну реплику на весь GET- или HEAD-запрос,
+и ReplicaRouter читает с неё модели приложения news: так работают
+публичные страницы и список новостей в админке. Первая же запись в
+модели news переключает остаток запроса на основную базу, а cookie
+оставляет на ней и следующие запросы клиента, пока реплики догоняют
+основную базу. Вне запросов (команды, shell, тесты) всё читается
+с основной базы.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS
+
+PRIMARY_COOKIE = 'use_primary_db'
+
+
+class RequestState:
+    """Выбранная для чтения база и признак записи в текущем запросе."""
+
+    def __init__(self, read_alias):
+        self.read_alias = read_alias
+        self.wrote = False
+
+
+_state = ContextVar('news_replica_state', default=None)
+
+
+class ReplicaRouter:
+    app_labels = {'news'}
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in self.app_labels:
+            return None
+        state = _state.get()
+        if state is None or state.read_alias is None:
+            # Явный ответ не даёт Django читать связанные объекты
+            # с реплики, откуда был загружен исходный объект.
+            return DEFAULT_DB_ALIAS
+        return state.read_alias
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label not in self.app_labels:
+            return None
+        state = _state.get()
+        if state is not None:
+            state.read_alias = None
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+
+class ReplicaMiddleware:
+    """Выбирает базу для чтения на время запроса.
+
+    Без настроенных реплик Django исключает middleware из цепочки.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        read_alias = None
+        if (
+            request.method in ('GET', 'HEAD')
+            and PRIMARY_COOKIE not in request.COOKIES
+        ):
+            read_alias = random.choice(settings.DATABASE_REPLICAS)
+        state = RequestState(read_alias)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote:
+            response.set_cookie(
+                PRIMARY_COOKIE, '1',
+                max_age=settings.DATABASE_REPLICA_LAG,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
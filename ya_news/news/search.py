@@ -0,0 +1,101 @@
+"""Полнотекстовый поиск по новостям через индекс SQLite FTS5.
+
+Таблица news_news_fts хранит только индекс: текст она читает из
+news_news по rowid (external content). Таблицу и триггеры описывает
+модуль fts, а создаёт миграция 0008_news_search; триггеры обновляют
+индекс при любой записи в news_news, в том числе через bulk_create()
+и update(), которые не отправляют сигналы.
+"""
+import re
+
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .fts import FTS_TABLE
+
+# Границы подсветки: управляющие символы не встречаются в тексте
+# новостей и переживают экранирование HTML.
+MARK_START, MARK_END = '\x02', '\x03'
+SNIPPET_TOKENS = 16
+
+WORD_RE = re.compile(r'\w+')
+# Более короткие слова ищутся целиком: префикс из одной-двух букв
+# разворачивается почти во весь словарь индекса.
+MIN_PREFIX_LENGTH = 3
+
+
+def build_match(query):
+    """Запрос FTS5 из пользовательской строки.
+
+    Каждое слово берётся в кавычки, поэтому операторы FTS5 во вводе
+    не работают и не вызывают синтаксических ошибок; слова не короче
+    MIN_PREFIX_LENGTH ищутся по префиксу, остальные — целиком, и
+    встретиться должны все. Пустой запрос — None.
+    """
+    words = WORD_RE.findall(query)
+    if not words:
+        return None
+    return ' '.join(
+        f'"{word}"*' if len(word) >= MIN_PREFIX_LENGTH else f'"{word}"'
+        for word in words
+    )
+
+
+def highlight(value):
+    """Экранирует HTML и заменяет границы подсветки на <mark>."""
+    return mark_safe(
+        escape(value)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+def search(query, offset, limit):
+    """Новости по релевантности: список словарей с ключами pk, title,
+    date и snippet.
+
+    Выбирается на одну запись больше limit, чтобы без COUNT(*) узнать,
+    есть ли следующая страница.
+    """
+    match = build_match(query)
+    if match is None:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT news.id, news.date,
+                   highlight({FTS_TABLE}, 0, %s, %s),
+                   snippet({FTS_TABLE}, 1, %s, %s, '…', %s)
+            FROM {FTS_TABLE}
+            JOIN news_news AS news ON news.id = {FTS_TABLE}.rowid
+            WHERE {FTS_TABLE} MATCH %s
+            ORDER BY rank
+            LIMIT %s OFFSET %s
+            """,
+            [
+                MARK_START, MARK_END, MARK_START, MARK_END,
+                SNIPPET_TOKENS, match, limit + 1, offset,
+            ],
+        )
+        rows = cursor.fetchall()
+    return [
+        {
+            'pk': pk,
+            'date': date,
+            'title': highlight(title),
+            'snippet': highlight(snippet),
+        }
+        for pk, date, title, snippet in rows
+    ]
+
+
+def rebuild():
+    """Перестраивает индекс по текущему содержимому news_news."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+        )
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')"
+        )
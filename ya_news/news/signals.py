@@ -0,0 +1,46 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import HOME_VERSION_KEY, bump_version, news_version_key
+from .counters import forget_most_read
+from .events import publish_comment
+from .models import Comment, News
+
+
+def bump_versions(*version_keys):
+    """Сбрасываем версии сразу и ещё раз после фиксации транзакции.
+
+    Повторный сброс не даёт закешировать страницу, отрисованную
+    параллельным запросом до фиксации изменений.
+    """
+    def bump():
+        for version_key in version_keys:
+            bump_version(version_key)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+@receiver((post_save, post_delete), sender=News)
+def invalidate_news_pages(sender, instance, **kwargs):
+    """Сбрасываем кеш главной страницы, страницы новости и рейтинг,
+    в котором хранятся заголовки.
+    """
+    bump_versions(HOME_VERSION_KEY, news_version_key(instance.pk))
+    forget_most_read()
+
+
+@receiver((post_save, post_delete), sender=Comment)
+def invalidate_comment_pages(sender, instance, **kwargs):
+    """Комментарий меняет страницу новости и счётчик на главной."""
+    bump_versions(HOME_VERSION_KEY, news_version_key(instance.news_id))
+
+
+@receiver(post_save, sender=Comment)
+def publish_new_comment(sender, instance, created, **kwargs):
+    """Новый комментарий после фиксации уходит в поток событий новости."""
+    if created:
+        transaction.on_commit(partial(publish_comment, instance))
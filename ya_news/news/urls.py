@@ -1,16 +1,34 @@
 from django.urls import path
 
-from news import views
+from news import events, views
 
 app_name = 'news'
 
 urlpatterns = [
     path('', views.NewsList.as_view(), name='home'),
+    path('archive/', views.NewsArchive.as_view(), name='archive'),
+    path('search/', views.NewsSearch.as_view(), name='search'),
+    path('trending/', views.NewsTrending.as_view(), name='trending'),
     path('news/<int:pk>/', views.NewsDetailView.as_view(), name='detail'),
+    path(
+        'news/<int:pk>/comments/',
+        views.NewsCommentsMore.as_view(),
+        name='comments'
+    ),
+    path(
+        'news/<int:pk>/events/',
+        events.NewsEvents.as_view(),
+        name='events'
+    ),
     path(
         'delete_comment/<int:pk>/',
         views.CommentDelete.as_view(),
         name='delete'
     ),
+    path(
+        'export/<slug:dataset>/',
+        views.NewsExport.as_view(),
+        name='export'
+    ),
     path('edit_comment/<int:pk>/', views.CommentUpdate.as_view(), name='edit'),
 ]
@@ -1,14 +1,34 @@
 from django.conf import settings
-from django.contrib.auth.mixins import LoginRequiredMixin
-from django.shortcuts import get_object_or_404
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.db import transaction
+from django.http import (
+    Http404,
+    HttpResponseBadRequest,
+    HttpResponseRedirect,
+    StreamingHttpResponse,
+)
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.views import generic
 
-from .forms import CommentForm
+from .cache import (
+    HOME_VERSION_KEY,
+    AnonymousPageCacheMixin,
+    ConditionalGetMixin,
+    news_version_key,
+)
+from .counters import most_read, record_view
+from .export import DATASETS, FORMATS, SERIALIZERS, iter_rows
+from .forms import CommentForm, NewCommentForm
 from .models import Comment, News
+from .pagination import encode_cursor, keyset_page
+from .search import search
 
 
-class NewsList(generic.ListView):
+class NewsList(
+        ConditionalGetMixin, AnonymousPageCacheMixin, generic.ListView
+):
     """Список новостей."""
     model = News
     template_name = 'news/home.html'
@@ -18,64 +38,213 @@ class NewsList(generic.ListView):
         Выводим только несколько последних новостей.
 
         Их количество определяется в настройках проекта.
+        Число комментариев берётся из денормализованного поля
+        comment_count, поэтому сами комментарии не загружаются,
+        а вместо полного текста выводится готовая выдержка.
+        """
+        return self.model.objects.defer('text')[
+            :settings.NEWS_COUNT_ON_HOME_PAGE
+        ]
+
+    def get_context_data(self, **kwargs):
+        """Добавляем курсор архива, продолжающего главную страницу,
+        и рейтинг самых читаемых новостей из кеша.
+        """
+        context = super().get_context_data(**kwargs)
+        object_list = list(context['object_list'])
+        if len(object_list) == settings.NEWS_COUNT_ON_HOME_PAGE:
+            context['archive_cursor'] = encode_cursor(
+                object_list[-1], self.model._meta.ordering
+            )
+        context['most_read'] = most_read()
+        return context
+
+    def get_cache_version_key(self):
+        return HOME_VERSION_KEY
+
+    def get_validators(self):
+        """Валидаторы по новостям, попадающим на главную страницу,
+        и по рейтингу самых читаемых.
+
+        После отрисовки используются уже загруженные новости.
+        """
+        object_list = getattr(self, 'object_list', None)
+        if object_list is None:
+            object_list = self.model.objects.only('pk', 'updated')[
+                :settings.NEWS_COUNT_ON_HOME_PAGE
+            ]
+        rows = [(news.pk, news.updated) for news in object_list]
+        if not rows:
+            return None
+        etag_source = ','.join(
+            f'{pk}:{updated.timestamp()}' for pk, updated in rows
+        )
+        ranking = ','.join(str(pk) for pk, _ in most_read())
+        last_modified = max(updated for _, updated in rows)
+        return f'{etag_source}|{ranking}', last_modified
+
+
+class NewsTrending(AnonymousPageCacheMixin, generic.ListView):
+    """Самые обсуждаемые новости по недавним комментариям."""
+    model = News
+    template_name = 'news/trending.html'
+
+    def get_queryset(self):
+        """Читаются только первые строки индекса по рейтингу
+        обсуждаемости, комментарии не загружаются.
+        """
+        return self.model.objects.defer('text').trending(
+            settings.NEWS_COUNT_IN_TRENDING
+        )
+
+    def get_cache_version_key(self):
+        """Новый комментарий и команда decay_trending сбрасывают версию
+        главной страницы, от неё же зависит и эта.
         """
-        return self.model.objects.prefetch_related(
-            'comment_set'
-        )[:settings.NEWS_COUNT_ON_HOME_PAGE]
+        return HOME_VERSION_KEY
 
 
-class NewsDetail(generic.DetailView):
+class NewsArchive(generic.ListView):
+    """Архив новостей с постраничным выводом по курсору."""
+    model = News
+    template_name = 'news/archive.html'
+
+    def get_queryset(self):
+        object_list, self.next_cursor = keyset_page(
+            self.model.objects.all(),
+            self.model._meta.ordering,
+            settings.NEWS_COUNT_ON_ARCHIVE_PAGE,
+            self.request.GET.get('cursor'),
+        )
+        return object_list
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['next_cursor'] = self.next_cursor
+        return context
+
+
+class CommentsPageMixin:
+    """Постраничный вывод комментариев к новости по курсору."""
+    comments_ordering = ('path',)
+
+    def get_context_data(self, **kwargs):
+        """Страница комментариев вместе с авторами одним запросом.
+
+        Комментарии идут в порядке путей: ответы сразу после
+        родителя, поэтому страница — диапазон индекса (news, path).
+        Помеченные модерацией комментарии не выводятся.
+        """
+        context = super().get_context_data(**kwargs)
+        context['comments'], context['next_cursor'] = keyset_page(
+            Comment.objects.thread(
+                self.kwargs['pk']
+            ).filter(flagged=False).select_related('author'),
+            self.comments_ordering,
+            settings.COMMENTS_COUNT_ON_PAGE,
+            self.request.GET.get('cursor'),
+        )
+        return context
+
+
+class NewsDetail(
+        ConditionalGetMixin,
+        AnonymousPageCacheMixin,
+        CommentsPageMixin,
+        generic.DetailView
+):
     model = News
     template_name = 'news/detail.html'
 
-    def get_object(self, queryset=None):
-        obj = get_object_or_404(
-            self.model.objects.prefetch_related('comment_set__author'),
-            pk=self.kwargs['pk']
+    def get_cache_version_key(self):
+        return news_version_key(self.kwargs['pk'])
+
+    def get_validators(self):
+        """Валидаторы по строке новости.
+
+        Добавление, правка и удаление комментария обновляют
+        News.updated, поэтому комментарии не читаются.
+        """
+        news = getattr(self, 'object', None)
+        if news is None:
+            news = self.model.objects.filter(
+                pk=self.kwargs['pk']
+            ).only('pk', 'updated', 'comment_count').first()
+        if news is None:
+            return None
+        etag_source = (
+            f'{news.pk}:{news.updated.timestamp()}:{news.comment_count}'
         )
-        return obj
+        return etag_source, news.updated
 
     def get_context_data(self, **kwargs):
+        """Параметр reply открывает форму ответа на комментарий."""
         context = super().get_context_data(**kwargs)
         if self.request.user.is_authenticated:
-            context['form'] = CommentForm()
+            reply = self.request.GET.get('reply', '')
+            context['form'] = NewCommentForm(initial={
+                'parent': int(reply) if reply.isdigit() else None
+            })
         return context
 
 
+class NewsCommentsMore(CommentsPageMixin, generic.TemplateView):
+    """Следующая порция комментариев в виде HTML-фрагмента."""
+    template_name = 'news/comments.html'
+
+
 class NewsComment(
         LoginRequiredMixin,
+        CommentsPageMixin,
         generic.detail.SingleObjectMixin,
         generic.FormView
 ):
     model = News
-    form_class = CommentForm
+    form_class = NewCommentForm
     template_name = 'news/detail.html'
 
     def post(self, request, *args, **kwargs):
         self.object = self.get_object()
         return super().post(request, *args, **kwargs)
 
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['news'] = self.object
+        return kwargs
+
     def form_valid(self, form):
         comment = form.save(commit=False)
         comment.news = self.object
         comment.author = self.request.user
-        comment.save()
+        comment.parent = form.cleaned_data['parent']
+        with transaction.atomic():
+            comment.save()
+            News.objects.filter(pk=self.object.pk).change_comment_count(1)
         return super().form_valid(form)
 
     def get_success_url(self):
-        post = self.get_object()
-        return reverse('news:detail', kwargs={'pk': post.pk}) + '#comments'
+        return reverse(
+            'news:detail', kwargs={'pk': self.object.pk}
+        ) + '#comments'
 
 
 class NewsDetailView(generic.View):
+    """Страница новости: чтение и отправка комментария.
+
+    Вложенные представления создаются один раз при импорте модуля.
+    """
+    detail_view = staticmethod(NewsDetail.as_view())
+    comment_view = staticmethod(NewsComment.as_view())
 
     def get(self, request, *args, **kwargs):
-        view = NewsDetail.as_view()
-        return view(request, *args, **kwargs)
+        """Просмотр учитывается и для ответа из кеша или 304."""
+        response = self.detail_view(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            record_view(kwargs['pk'])
+        return response
 
     def post(self, request, *args, **kwargs):
-        view = NewsComment.as_view()
-        return view(request, *args, **kwargs)
+        return self.comment_view(request, *args, **kwargs)
 
 
 class CommentBase(LoginRequiredMixin):
@@ -83,14 +252,19 @@ class CommentBase(LoginRequiredMixin):
     model = Comment
 
     def get_success_url(self):
-        comment = self.get_object()
+        """Адрес строится по уже загруженному комментарию."""
         return reverse(
-            'news:detail', kwargs={'pk': comment.news.pk}
+            'news:detail', kwargs={'pk': self.object.news_id}
         ) + '#comments'
 
     def get_queryset(self):
-        """Пользователь может работать только со своими комментариями."""
-        return self.model.objects.filter(author=self.request.user)
+        """Пользователь может работать только со своими комментариями.
+
+        Новость нужна шаблонам страниц, поэтому загружается сразу.
+        """
+        return self.model.objects.filter(
+            author=self.request.user
+        ).select_related('news')
 
 
 class CommentUpdate(CommentBase, generic.UpdateView):
@@ -98,7 +272,91 @@ class CommentUpdate(CommentBase, generic.UpdateView):
     template_name = 'news/edit.html'
     form_class = CommentForm
 
+    def form_valid(self, form):
+        """Правка обновляет и время изменения новости, как добавление
+        и удаление комментария.
+        """
+        with transaction.atomic():
+            response = super().form_valid(form)
+            News.objects.filter(pk=self.object.news_id).touch()
+        return response
+
 
 class CommentDelete(CommentBase, generic.DeleteView):
-    """Удаление комментария."""
+    """Удаление комментария вместе с ответами на него."""
     template_name = 'news/delete.html'
+
+    def delete(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        success_url = self.get_success_url()
+        with transaction.atomic():
+            # Помеченные ответы в счётчик не входят.
+            visible = Comment.objects.subtree(self.object).filter(
+                flagged=False
+            ).count()
+            self.object.delete()
+            News.objects.filter(
+                pk=self.object.news_id
+            ).change_comment_count(-visible)
+        return HttpResponseRedirect(success_url)
+
+
+class NewsExport(UserPassesTestMixin, generic.View):
+    """Потоковая выгрузка новостей или комментариев для аналитики.
+
+    Формат задаётся параметром format (ndjson или csv), параметр since
+    оставляет только комментарии, созданные позже указанного времени.
+    """
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, dataset):
+        if dataset not in DATASETS:
+            raise Http404('Неизвестный набор данных.')
+        export_format = request.GET.get('format', 'ndjson')
+        if export_format not in FORMATS:
+            return HttpResponseBadRequest('Неизвестный формат.')
+        since = request.GET.get('since')
+        if since is not None:
+            if dataset != 'comments':
+                return HttpResponseBadRequest(
+                    'Параметр since доступен только для комментариев.'
+                )
+            since = parse_datetime(since)
+            if since is None:
+                return HttpResponseBadRequest('Некорректное время since.')
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+        rows = iter_rows(dataset, since)
+        response = StreamingHttpResponse(
+            SERIALIZERS[export_format](dataset, rows),
+            content_type=FORMATS[export_format],
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{dataset}.{export_format}"'
+        )
+        return response
+
+
+class NewsSearch(generic.TemplateView):
+    """Поиск по заголовкам и текстам новостей, лучшие совпадения первыми."""
+    template_name = 'news/search.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get('q', '').strip()
+        try:
+            page = max(int(self.request.GET.get('page', 1)), 1)
+        except ValueError:
+            page = 1
+        per_page = settings.NEWS_COUNT_ON_SEARCH_PAGE
+        results = search(query, (page - 1) * per_page, per_page)
+        context.update(
+            query=query,
+            results=results[:per_page],
+            page=page,
+            previous_page=page - 1 if page > 1 else None,
+            next_page=page + 1 if len(results) > per_page else None,
+        )
+        return context
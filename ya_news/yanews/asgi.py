@@ -8,9 +8,20 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 """
 
 import os
+import sys
+from pathlib import Path
 
 from django.core.asgi import get_asgi_application
 
+# Общее приложение perf лежит в корне репозитория, рядом с проектами.
+sys.path.append(str(Path(__file__).resolve().parents[2]))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yanews.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Модели можно импортировать только после настройки Django.
+from news.counters import flush_at_exit  # noqa: E402
+from news.events import EventStreamRouter  # noqa: E402
+
+application = EventStreamRouter(django_application)
+flush_at_exit()
@@ -17,10 +17,13 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'perf.apps.PerfConfig',
     'news.apps.NewsConfig',
 ]
 
 MIDDLEWARE = [
+    'perf.middleware.PerformanceMiddleware',
+    'news.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -28,6 +31,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'news.async_views.AsyncViewsMiddleware',
 ]
 
 ROOT_URLCONF = 'yanews.urls'
@@ -58,6 +62,30 @@ DATABASES = {
     }
 }
 
+# Сколько секунд пользователь хранится в кеше (perf.auth).
+USER_CACHE_TIMEOUT = 60
+
+# PRAGMA для каждого нового соединения с SQLite (perf.sqlite).
+SQLITE_PRAGMAS = {}
+
+# Псевдонимы из DATABASES, с которых читаются новости (news.replicas),
+# и сколько секунд после записи клиент читает с основной базы.
+DATABASE_ROUTERS = ['news.replicas.ReplicaRouter']
+DATABASE_REPLICAS = []
+DATABASE_REPLICA_LAG = 5
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Фрагменты шаблонов из тега {% cache %}.
+    'template_fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'template_fragments',
+        'OPTIONS': {'MAX_ENTRIES': 10_000},
+    },
+}
+
 
 AUTH_PASSWORD_VALIDATORS = []
 
@@ -80,3 +108,49 @@ LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('news:home')
 
 NEWS_COUNT_ON_HOME_PAGE = 10
+NEWS_COUNT_ON_ARCHIVE_PAGE = 20
+NEWS_COUNT_ON_SEARCH_PAGE = 10
+COMMENTS_COUNT_ON_PAGE = 50
+NEWS_PAGE_CACHE_TIMEOUT = 60 * 15
+NEWS_COUNT_IN_MOST_READ = 5
+# Как часто просмотры новостей записываются в БД, секунды.
+NEWS_VIEWS_FLUSH_INTERVAL = 10
+NEWS_COUNT_IN_TRENDING = 10
+# Рейтинг обсуждаемых новостей: за сколько секунд вклад комментария
+# уменьшается вдвое, как часто по расписанию запускается команда
+# decay_trending и ниже какого значения рейтинг обнуляется.
+NEWS_TRENDING_HALF_LIFE = 6 * 60 * 60
+NEWS_TRENDING_DECAY_INTERVAL = 10 * 60
+NEWS_TRENDING_MIN_SCORE = 0.01
+EXPORT_CHUNK_SIZE = 2000
+# Файл с дополнительными запрещёнными словами, по одному на строку.
+BAD_WORDS_FILE = None
+# Потоки для запросов к БД и отрисовки асинхронных страниц под ASGI.
+ASYNC_VIEW_THREADS = 8
+# Поток новых комментариев (news.events): пауза между служебными
+# сообщениями в секундах и предел очереди медленного подписчика.
+NEWS_EVENTS_PING_INTERVAL = 15
+NEWS_EVENTS_QUEUE_SIZE = 100
+
+# Замеры производительности запросов (perf.middleware).
+PERF_INSTRUMENTATION = False
+PERF_SAMPLES = 1000
+PERF_FLUSH_INTERVAL = 10
+PERF_STATS_DIR = None
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'perf': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
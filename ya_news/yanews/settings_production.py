@@ -0,0 +1,64 @@
+"""Профиль для работы под нагрузкой на одном сервере с SQLite.
+
+Запуск: DJANGO_SETTINGS_MODULE=yanews.settings_production.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import BASE_DIR, CACHES, DATABASES, TEMPLATES
+
+DEBUG = False
+
+# Шаблоны разбираются один раз на процесс. При DEBUG = False Django
+# включает этот загрузчик и сам, здесь он задан явно.
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'loaders': [(
+            'django.template.loaders.cached.Loader',
+            [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ],
+        )],
+    },
+}]
+
+# Соединение переиспользуется между запросами одного потока вместо
+# нового подключения и повторной настройки прагм на каждый запрос.
+DATABASES = {'default': {**DATABASES['default'], 'CONN_MAX_AGE': 600}}
+
+# Версии страниц, рейтинг, сессии и пользователи хранятся в кеше,
+# общем для всех процессов сервера и для management-команд
+# (import_news, seed, decay_trending, sync_replicas): сброс версии в
+# одном процессе сразу виден остальным. Файловый кеш общий для
+# процессов одного сервера; incr у него не атомарен, но для версий
+# важно лишь, что значение изменилось. При нескольких серверах его
+# заменяет memcached. Фрагменты шаблонов остаются в памяти процесса.
+CACHES = {
+    **CACHES,
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {'MAX_ENTRIES': 100_000},
+    },
+}
+
+# Сессия и пользователь берутся из кеша, без запросов к БД.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+AUTHENTICATION_BACKENDS = ['perf.auth.CachedModelBackend']
+
+SQLITE_PRAGMAS = {
+    # Читатели не блокируют писателя и наоборот; режим сохраняется
+    # в файле базы.
+    'journal_mode': 'WAL',
+    # В режиме WAL синхронизация при каждой фиксации не нужна для
+    # целостности: после сбоя питания теряются лишь последние транзакции.
+    'synchronous': 'NORMAL',
+    # 64 МБ кеша страниц на соединение (отрицательное значение — КБ).
+    'cache_size': -64 * 1024,
+    'mmap_size': 256 * 1024 * 1024,
+    # Сколько миллисекунд ждать блокировку, прежде чем вернуть
+    # "database is locked".
+    'busy_timeout': 5000,
+}
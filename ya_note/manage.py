@@ -2,6 +2,10 @@
 """Django's command-line utility for administrative tasks."""
 import os
 import sys
+from pathlib import Path
+
+# Общее приложение perf лежит в корне репозитория, рядом с проектами.
+sys.path.append(str(Path(__file__).resolve().parent.parent))
 
 
 def main():
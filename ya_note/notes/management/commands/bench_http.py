@@ -0,0 +1,56 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from notes.models import Note
+from perf.bench import BaseBenchmarkCommand, Scenario
+
+User = get_user_model()
+
+
+class Command(BaseBenchmarkCommand):
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--notes-per-user', type=int, default=100)
+
+    def seed(self, options):
+        User.objects.bulk_create(
+            User(username=f'user{index}') for index in range(options['users'])
+        )
+        users = list(User.objects.order_by('pk'))
+        Note.objects.bulk_create(
+            (
+                Note(
+                    title=f'Заметка {index}',
+                    text='Текст заметки. ' * 20,
+                    slug=f'user{user.pk}-note{index}',
+                    author=user,
+                )
+                for user in users
+                for index in range(options['notes_per_user'])
+            ),
+            batch_size=1000,
+        )
+
+        note = Note.objects.select_related('author').first()
+        author = note.author
+        return [
+            Scenario('notes:home', reverse('notes:home')),
+            Scenario('notes:list', reverse('notes:list'), author),
+            Scenario(
+                'notes:detail',
+                reverse('notes:detail', args=(note.slug,)),
+                author,
+            ),
+            Scenario('notes:add', reverse('notes:add'), author),
+            Scenario(
+                'notes:edit', reverse('notes:edit', args=(note.slug,)), author
+            ),
+            Scenario(
+                'notes:delete',
+                reverse('notes:delete', args=(note.slug,)),
+                author,
+            ),
+            Scenario('notes:success', reverse('notes:success'), author),
+        ]
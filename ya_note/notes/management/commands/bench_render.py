@@ -0,0 +1,35 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import Count
+from django.urls import reverse
+
+from perf.bench import BaseRenderBenchmarkCommand
+
+User = get_user_model()
+
+
+class Command(BaseRenderBenchmarkCommand):
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--notes', type=int, default=500)
+
+    def seed(self, options):
+        call_command(
+            'seed', users=20, notes=options['notes'], stdout=StringIO(),
+        )
+        user = User.objects.annotate(
+            total=Count('note')
+        ).order_by('-total').first()
+        note = user.note_set.first()
+        return [
+            ('notes:home', reverse('notes:home'), user),
+            ('notes:list', reverse('notes:list'), user),
+            (
+                'notes:detail',
+                reverse('notes:detail', args=(note.slug,)),
+                user,
+            ),
+        ]
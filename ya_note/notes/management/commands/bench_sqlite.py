@@ -0,0 +1,37 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+
+from notes.models import Note
+from perf.bench import BaseMixedBenchmarkCommand
+
+User = get_user_model()
+
+
+class Command(BaseMixedBenchmarkCommand):
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--notes', type=int, default=50_000)
+
+    def seed(self, options):
+        call_command(
+            'seed', users=options['users'], notes=options['notes'],
+            skew=0, seed=options['seed'], stdout=StringIO(),
+        )
+        user_ids = list(User.objects.values_list('pk', flat=True))
+        note_ids = list(Note.objects.values_list('pk', flat=True))
+
+        def read(rnd):
+            """Список заметок пользователя, как NotesList."""
+            list(Note.objects.filter(author_id=rnd.choice(user_ids)))
+
+        def write(rnd):
+            """Правка заметки, как NoteUpdate."""
+            note = Note.objects.get(pk=rnd.choice(note_ids))
+            note.text = f'Текст из прогона {rnd.random()}'
+            note.save()
+
+        return read, write
@@ -0,0 +1,81 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+
+from notes.models import Note
+from perf.seeding import BulkLoader, fast_sqlite, next_number, zipf_weights
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями и заметками. '
+        'Число заметок у пользователей распределено по закону Ципфа: '
+        '--skew 0 даёт равномерное распределение. При одинаковом --seed '
+        'данные совпадают.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--notes', type=int, default=1_000_000)
+        parser.add_argument('--skew', type=float, default=1.0)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument(
+            '--password', default='password',
+            help='Общий пароль всех созданных пользователей.',
+        )
+
+    def handle(self, *args, **options):
+        if options['users'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь.')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть положительным.')
+        rnd = random.Random(options['seed'])
+        loader = BulkLoader(self.stdout, options['batch_size'])
+
+        with fast_sqlite():
+            # Хеш пароля вычисляется один раз: медленный алгоритм
+            # хеширования не замедляет загрузку.
+            password = make_password(options['password'])
+            first = next_number(User)
+            loader.load(User, (
+                User(username=f'seed{first + index}', password=password)
+                for index in range(options['users'])
+            ))
+            # bulk_create не заполняет ключи, поэтому они читаются заново.
+            user_ids = sorted(
+                User.objects.order_by('-pk').values_list('pk', flat=True)
+                [:options['users']]
+            )
+            rnd.shuffle(user_ids)
+
+            first = next_number(Note)
+            loader.insert(
+                Note,
+                ('title', 'text', 'slug', 'author'),
+                self.notes(rnd, first, user_ids, options),
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано строк: {loader.rows}, {loader.rate():.0f} строк/мин'
+        ))
+
+    @staticmethod
+    def notes(rnd, first, user_ids, options):
+        """Строки заметок: автор выбирается по весам Ципфа."""
+        cum_weights = zipf_weights(len(user_ids), options['skew'])
+        count, batch_size = options['notes'], options['batch_size']
+        for start in range(0, count, batch_size):
+            size = min(batch_size, count - start)
+            authors = rnd.choices(user_ids, cum_weights=cum_weights, k=size)
+            for index, author_id in enumerate(authors, first + start):
+                yield (
+                    f'Заметка {index}',
+                    f'Текст синтетической заметки номер {index}.',
+                    f'seed-note-{index}',
+                    author_id,
+                )
@@ -1,5 +1,9 @@
+from contextlib import contextmanager
+
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from notes.models import Note
@@ -72,3 +76,26 @@ class TestFixtures(TestCase):
         cls.login_url = reverse('users:login')
         cls.logout_url = reverse('users:logout')
         cls.signup_url = reverse('users:signup')
+
+    @contextmanager
+    def assert_no_full_scan(self):
+        """Ни один SELECT внутри блока не читает таблицу целиком.
+
+        Обход по индексу допустим только вместе с LIMIT.
+        """
+        with CaptureQueriesContext(connection) as context:
+            yield
+        full_scans = []
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT'):
+                    continue
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                for row in cursor.fetchall():
+                    detail = row[-1]
+                    if detail.startswith('SCAN') and (
+                        'USING' not in detail or ' LIMIT ' not in sql
+                    ):
+                        full_scans.append((sql, detail))
+        self.assertEqual(full_scans, [])
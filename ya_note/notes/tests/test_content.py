@@ -1,5 +1,18 @@
+import json
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.module_loading import import_string
+
 from notes.forms import NoteForm
 from notes.tests.fixtures import TestFixtures
+from perf import stats as perf_stats
+from perf.auth import user_cache_key
+from yanote import settings_production
 
 
 class TestContent(TestFixtures):
@@ -32,3 +45,77 @@ class TestContent(TestFixtures):
                 response = self.auth_client.get(url)
                 self.assertIn('form', response.context)
                 self.assertIsInstance(response.context['form'], NoteForm)
+
+    def test_views_use_indexes(self):
+        """Запросы страниц заметок не читают таблицы целиком."""
+        for url in (
+            self.list_url,
+            self.detail_url,
+            self.edit_url,
+            self.delete_url,
+            self.add_url,
+        ):
+            with self.subTest(url=url):
+                with self.assert_no_full_scan():
+                    self.auth_client.get(url)
+        with self.subTest(url=self.add_url, method='post'):
+            with self.assert_no_full_scan():
+                self.auth_client.post(self.add_url, data=self.new_form_data)
+
+    def test_perf_instrumentation(self):
+        """Замеры запроса попадают в заголовок Server-Timing и в агрегаты
+        команды perf_stats.
+        """
+        with tempfile.TemporaryDirectory() as stats_dir, override_settings(
+            PERF_INSTRUMENTATION=True,
+            PERF_STATS_DIR=stats_dir,
+            PERF_FLUSH_INTERVAL=0,
+        ):
+            perf_stats.reset()
+            client = Client()
+            client.force_login(self.author)
+            response = client.get(self.list_url)
+            self.assertIn('db;dur=', response['Server-Timing'])
+            stdout = StringIO()
+            call_command('perf_stats', json=True, stdout=stdout)
+        summary = json.loads(stdout.getvalue())
+        self.assertEqual(summary['notes:list']['count'], 1)
+        self.assertEqual(
+            summary['notes:list']['size_p50'], len(response.content)
+        )
+
+    def test_production_cache_is_shared(self):
+        """Кеш профиля settings_production общий для процессов:
+        пользователь, удалённый из кеша одним процессом, не читается
+        другим.
+        """
+        with tempfile.TemporaryDirectory() as cache_dir:
+            config = {
+                **settings_production.CACHES['default'],
+                'LOCATION': cache_dir,
+            }
+            first, second = (
+                import_string(config['BACKEND'])(config['LOCATION'], config)
+                for _ in range(2)
+            )
+            key = user_cache_key(self.author.pk)
+            first.set(key, self.author)
+            self.assertEqual(second.get(key), self.author)
+            second.delete(key)
+            self.assertIsNone(first.get(key))
+
+    @override_settings(
+        SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+        AUTHENTICATION_BACKENDS=['perf.auth.CachedModelBackend'],
+    )
+    def test_cached_auth_runs_no_auth_queries(self):
+        """Сессия и пользователь авторизованного запроса берутся из кеша."""
+        client = Client()
+        client.force_login(self.author)
+        client.get(self.list_url)
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(self.list_url)
+        self.assertEqual(response.context['user'], self.author)
+        for query in context.captured_queries:
+            self.assertNotIn('FROM "django_session"', query['sql'])
+            self.assertNotIn('FROM "auth_user"', query['sql'])
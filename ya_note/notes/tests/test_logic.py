@@ -1,4 +1,8 @@
 from http import HTTPStatus
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
 
 from pytils.translit import slugify
 
@@ -6,6 +10,8 @@ from notes.forms import WARNING
 from notes.models import Note
 from notes.tests.fixtures import TestFixtures
 
+User = get_user_model()
+
 
 class TestNoteCreation(TestFixtures):
 
@@ -105,3 +111,49 @@ class TestNoteEditDelete(TestFixtures):
         self.assertEqual(note.title, self.the_same_note.title)
         self.assertEqual(note.author, self.the_same_note.author)
         self.assertEqual(note.slug, self.the_same_note.slug)
+
+
+class TestSeed(TestFixtures):
+
+    def test_seed_is_deterministic(self):
+        """Команда seed создаёт заданный объём заметок, одинаковый при
+        одинаковом зерне.
+        """
+        def seed():
+            # Заметки удаляются каскадно вместе с авторами.
+            User.objects.filter(username__startswith='seed').delete()
+            call_command(
+                'seed', users=5, notes=300, skew=1.5, seed=7,
+                batch_size=64, stdout=StringIO(),
+            )
+            # Имена новых строк продолжают нумерацию, поэтому авторы
+            # сравниваются по порядку создания.
+            authors = list(
+                User.objects.filter(username__startswith='seed')
+                .order_by('pk').values_list('pk', flat=True)
+            )
+            return [
+                authors.index(author_id) for author_id in
+                Note.objects.filter(slug__startswith='seed-')
+                .order_by('pk').values_list('author', flat=True)
+            ]
+
+        first = seed()
+        self.assertEqual(len(first), 300)
+        self.assertEqual(first, seed())
+
+    def test_seed_after_deletions(self):
+        """Повторный запуск seed после удаления пользователя и заметки
+        не повторяет уже занятые имена и адреса.
+        """
+        call_command(
+            'seed', users=3, notes=10, batch_size=64, stdout=StringIO()
+        )
+        Note.objects.filter(slug__startswith='seed-').first().delete()
+        User.objects.filter(username__startswith='seed').first().delete()
+        call_command(
+            'seed', users=3, notes=10, batch_size=64, stdout=StringIO()
+        )
+        self.assertEqual(
+            User.objects.filter(username__startswith='seed').count(), 5
+        )
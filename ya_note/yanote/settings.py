@@ -18,10 +18,12 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'perf.apps.PerfConfig',
     'notes.apps.NotesConfig'
 ]
 
 MIDDLEWARE = [
+    'perf.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -59,6 +61,24 @@ DATABASES = {
     }
 }
 
+# Сколько секунд пользователь хранится в кеше (perf.auth).
+USER_CACHE_TIMEOUT = 60
+
+# PRAGMA для каждого нового соединения с SQLite (perf.sqlite).
+SQLITE_PRAGMAS = {}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Фрагменты шаблонов из тега {% cache %}.
+    'template_fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'template_fragments',
+        'OPTIONS': {'MAX_ENTRIES': 10_000},
+    },
+}
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -87,3 +107,26 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('notes:home')
+
+# Замеры производительности запросов (perf.middleware).
+PERF_INSTRUMENTATION = False
+PERF_SAMPLES = 1000
+PERF_FLUSH_INTERVAL = 10
+PERF_STATS_DIR = None
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'perf': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}